@@ -0,0 +1,34 @@
+import os
+import time
+from collections import deque
+
+from interview_prep.parallel_permutations import iter_matching_permutations
+from interview_prep.string_permutations import iter_permutations
+
+X = 'abcdefghijk'
+
+
+def is_target(permutation):
+    # Module-level so worker processes can unpickle it
+    return permutation.startswith('k') and permutation.endswith('a')
+
+
+def measure(consume):
+    start = time.perf_counter()
+    num_matches = consume()
+    return time.perf_counter() - start, num_matches
+
+
+# Example usage: python -m interview_prep.benchmark_parallel_permutations
+if __name__ == '__main__':
+    duration, num_matches = measure(lambda: len([p for p in iter_permutations(X, distinct=True) if is_target(p)]))
+    print('single process          = {:6.2f} s   matches = {}'.format(duration, num_matches))
+
+    num_workers = 1
+    while num_workers <= os.cpu_count():
+        for ordered in [True, False]:
+            duration, num_matches = measure(lambda: len(deque(
+                iter_matching_permutations(X, is_target, num_workers=num_workers, ordered=ordered))))
+            print('{} workers, {:<9}     = {:6.2f} s   matches = {}'.format(
+                num_workers, 'ordered' if ordered else 'unordered', duration, num_matches))
+        num_workers *= 2
@@ -0,0 +1,68 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from interview_prep.string_permutations import count_distinct_permutations, iter_permutations_between_ranks
+
+SHARDS_PER_WORKER_DEFAULT = 8
+PENDING_SHARDS_PER_WORKER_DEFAULT = 2
+# A shard's matches travel back as one list, so no shard spans more permutations than this
+MAX_SHARD_SIZE_DEFAULT = 100000
+
+
+def get_shard_size(total_count, num_shards, max_shard_size=MAX_SHARD_SIZE_DEFAULT):
+    return max(1, min(-(-total_count // num_shards), max_shard_size))
+
+
+def iter_rank_ranges(total_count, shard_size):
+    # Lazy, n >= 13 has billions of permutations and so millions of shards
+    for start_rank in range(0, total_count, shard_size):
+        yield start_rank, min(start_rank + shard_size, total_count)
+
+
+def get_rank_ranges(total_count, num_shards, max_shard_size=MAX_SHARD_SIZE_DEFAULT):
+    return list(iter_rank_ranges(total_count, get_shard_size(total_count, num_shards, max_shard_size)))
+
+
+def find_matches_between_ranks(x, predicate, start_rank, end_rank):
+    return [permutation for permutation in iter_permutations_between_ranks(x, start_rank, end_rank)
+            if predicate is None or predicate(permutation)]
+
+
+def iter_matching_permutations(x, predicate=None, num_workers=None, num_shards=None, ordered=True,
+                               max_pending_shards=None, max_shard_size=MAX_SHARD_SIZE_DEFAULT):
+    """
+    Enumerates the distinct permutations of `x` on `num_workers` processes and yields those matching `predicate`
+    (a picklable, module-level function). The space is cut into at least `num_shards` lexicographic rank ranges of
+    at most `max_shard_size` permutations each, and at most `max_pending_shards` of them are in flight at once.
+    So however permissive the predicate, at most `max_pending_shards * max_shard_size` matches are held in memory.
+
+    With `ordered=True` matches come in lexicographic order, otherwise shard by shard as soon as each finishes.
+    """
+    num_workers = num_workers or os.cpu_count()
+    num_shards = num_shards or num_workers * SHARDS_PER_WORKER_DEFAULT
+    max_pending_shards = max_pending_shards or num_workers * PENDING_SHARDS_PER_WORKER_DEFAULT
+    total_count = count_distinct_permutations(x)
+    rank_ranges = iter_rank_ranges(total_count, get_shard_size(total_count, num_shards, max_shard_size))
+
+    with ProcessPoolExecutor(max_workers=num_workers) as executor:
+        pending_shards = deque()
+
+        def submit_shards():
+            while len(pending_shards) < max_pending_shards:
+                rank_range = next(rank_ranges, None)
+                if rank_range is None:
+                    return
+                pending_shards.append(executor.submit(find_matches_between_ranks, x, predicate, *rank_range))
+
+        submit_shards()
+        while pending_shards:
+            if ordered:
+                shard = pending_shards.popleft()
+            else:
+                shard = next(iter(wait(pending_shards, return_when=FIRST_COMPLETED).done))
+                pending_shards.remove(shard)
+
+            matches = shard.result()
+            submit_shards()
+            yield from matches
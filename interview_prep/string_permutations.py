@@ -1,3 +1,6 @@
+from collections import Counter
+from math import factorial
+
 
 def permutations(x):
     permutations_with_prefix(prefix="",
@@ -11,3 +14,125 @@ def permutations_with_prefix(prefix, remaining):
         for index, char in enumerate(remaining):
             permutations_with_prefix(prefix + char, remaining[:index] + remaining[index + 1:])
 
+
+def iter_permutations(x, distinct=False):
+    """
+    Lazily yields the permutations of `x` as strings, keeping a single mutable buffer of its characters.
+    All n! permutations come in Heap's algorithm order. With `distinct=True` every distinct permutation comes
+    exactly once, in lexicographic order (so the k-th one is `unrank_permutation(x, k)`).
+    """
+    if distinct:
+        return iter_distinct_permutations(sorted(x))
+
+    return iter_heap_permutations(list(x))
+
+
+def iter_heap_permutations(buffer):
+    # Every step is a single swap, c[i] plays the role of the loop counter at recursion depth i
+    n = len(buffer)
+    c = [0] * n
+    yield ''.join(buffer)
+
+    i = 1
+    while i < n:
+        if c[i] < i:
+            j = 0 if i % 2 == 0 else c[i]
+            buffer[j], buffer[i] = buffer[i], buffer[j]
+            yield ''.join(buffer)
+            c[i] += 1
+            i = 1
+        else:
+            c[i] = 0
+            i += 1
+
+
+def iter_distinct_permutations(buffer):
+    # Starting from the sorted buffer, next_permutation never produces the same arrangement twice
+    yield ''.join(buffer)
+    while next_permutation(buffer):
+        yield ''.join(buffer)
+
+
+def iter_permutations_between_ranks(x, start_rank, end_rank):
+    """Distinct permutations of `x` with lexicographic rank in [start_rank, end_rank), e.g. one shard of the space."""
+    end_rank = min(end_rank, count_distinct_permutations(x))
+    if start_rank >= end_rank:
+        return
+
+    buffer = list(unrank_permutation(x, start_rank))
+    yield ''.join(buffer)
+    for _ in range(end_rank - start_rank - 1):
+        next_permutation(buffer)
+        yield ''.join(buffer)
+
+
+def next_permutation(buffer):
+    """Rearranges `buffer` in place into the next lexicographic permutation, returns False after the last one."""
+    i = len(buffer) - 2
+    while i >= 0 and buffer[i] >= buffer[i + 1]:
+        i -= 1
+    if i < 0:
+        return False
+
+    j = len(buffer) - 1
+    while buffer[j] <= buffer[i]:
+        j -= 1
+    buffer[i], buffer[j] = buffer[j], buffer[i]
+    buffer[i + 1:] = reversed(buffer[i + 1:])
+
+    return True
+
+
+def count_distinct_permutations(x):
+    count = factorial(len(x))
+    for char_count in Counter(x).values():
+        count //= factorial(char_count)
+
+    return count
+
+
+def permutation_rank(permutation):
+    """Lexicographic index of `permutation` among the distinct permutations of its characters."""
+    char_counts = Counter(permutation)
+    remaining_count = count_distinct_permutations(permutation)
+    rank = 0
+
+    for position, char in enumerate(permutation):
+        remaining_length = len(permutation) - position
+        for smaller_char in sorted(char_counts):
+            if smaller_char >= char:
+                break
+            # Permutations of the remaining characters that start with smaller_char
+            rank += remaining_count * char_counts[smaller_char] // remaining_length
+
+        remaining_count = remaining_count * char_counts[char] // remaining_length
+        char_counts[char] -= 1
+        if char_counts[char] == 0:
+            del char_counts[char]
+
+    return rank
+
+
+def unrank_permutation(x, rank):
+    """The `rank`-th distinct permutation of the characters of `x` in lexicographic order."""
+    remaining_count = count_distinct_permutations(x)
+    if not 0 <= rank < remaining_count:
+        raise ValueError('rank = {} is out of range, {} has {} distinct permutations'.format(rank, x, remaining_count))
+
+    char_counts = Counter(x)
+    permutation = []
+
+    for remaining_length in range(len(x), 0, -1):
+        for char in sorted(char_counts):
+            block_count = remaining_count * char_counts[char] // remaining_length
+            if rank < block_count:
+                break
+            rank -= block_count
+
+        permutation.append(char)
+        remaining_count = block_count
+        char_counts[char] -= 1
+        if char_counts[char] == 0:
+            del char_counts[char]
+
+    return ''.join(permutation)
@@ -1,17 +1,25 @@
+import os
+import threading
+import time
 from json import JSONDecodeError
 
 from imgurpython import ImgurClient
 from imgurpython.helpers.error import ImgurClientError
 
-from screenshots_to_url.constants import CLIENT_ID, CLIENT_SECRET, IMGUR, ACCESS_TOKEN, REFRESH_TOKEN
+from screenshots_to_url.constants import CLIENT_ID, CLIENT_SECRET, IMGUR, ACCESS_TOKEN, REFRESH_TOKEN, EXPIRES_AT
 import json
 
 from screenshots_to_url.system_utils import is_file
 
+MAX_CLIENT_ATTEMPTS = 3
+# Imgur access tokens live for a month, they are refreshed a day before that
+ACCESS_TOKEN_LIFETIME = 28 * 24 * 60 * 60
+REFRESH_MARGIN = 24 * 60 * 60
 
-def get_access_keys_dict():
-    if is_file(IMGUR):
-        with open(IMGUR) as json_file:
+
+def get_access_keys_dict(file_path=IMGUR):
+    if is_file(file_path):
+        with open(file_path) as json_file:
             try:
                 return json.load(json_file)
             except JSONDecodeError as e:
@@ -21,9 +29,16 @@ def get_access_keys_dict():
         return {}
 
 
-def write_access_keys(access_keys):
-    with open(IMGUR, 'w') as outfile:
+def write_access_keys(access_keys, file_path=IMGUR):
+    # Written next to the target and renamed, so a crash never leaves half a credentials file.
+    # The file holds client_secret and refresh_token, so it is only ever readable by its owner.
+    temporary_file_path = '{}.{}.tmp'.format(file_path, os.getpid())
+    if os.path.exists(temporary_file_path):
+        os.remove(temporary_file_path)
+    file_descriptor = os.open(temporary_file_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(file_descriptor, 'w') as outfile:
         json.dump(access_keys, outfile, indent=2)
+    os.replace(temporary_file_path, file_path)
 
 
 def access_keys_are_configured(access_keys):
@@ -52,6 +67,7 @@ def extract_tokens(access_keys_dict, client, read_new_token):
     if not read_new_token and tokens_are_configured(access_keys_dict):
         access_token = access_keys_dict[ACCESS_TOKEN]
         refresh_token = access_keys_dict[REFRESH_TOKEN]
+        expires_at = access_keys_dict.get(EXPIRES_AT)
     else:
         authorization_url = client.get_auth_url('pin')
         print("Go to the following URL: {0}".format(authorization_url))
@@ -60,33 +76,95 @@ def extract_tokens(access_keys_dict, client, read_new_token):
         credentials = client.authorize(pin, 'pin')
         access_token = credentials['access_token']
         refresh_token = credentials['refresh_token']
+        expires_at = time.time() + credentials.get('expires_in', ACCESS_TOKEN_LIFETIME)
+
+    return access_token, refresh_token, expires_at
+
+
+def create_client(access_keys_dict, read_new_client, max_attempts=MAX_CLIENT_ATTEMPTS, client_factory=ImgurClient):
+    for attempt in range(max_attempts):
+        client_id, client_secret = extract_client_keys(access_keys_dict, read_new_client)
+
+        try:
+            return client_factory(client_id=client_id, client_secret=client_secret), client_id, client_secret
+        except ImgurClientError as e:
+            print(e)
+            print('Invalid credentials supplied. Let\'s try again :)')
+            read_new_client = True
 
-    return access_token, refresh_token
+    raise ImgurClientError('Invalid credentials supplied {} times in a row'.format(max_attempts))
 
 
-def get_imgur_client(read_new_client=False, read_new_token=False) -> ImgurClient:
-    access_keys_dict = get_access_keys_dict()
-    client_id, client_secret = extract_client_keys(access_keys_dict, read_new_client)
+def get_imgur_client(read_new_client=False, read_new_token=False, file_path=IMGUR,
+                     client_factory=ImgurClient) -> ImgurClient:
+    return authenticate(read_new_client, read_new_token, file_path, client_factory)[0]
 
-    try:
-        client = ImgurClient(client_id=client_id, client_secret=client_secret)
-    except ImgurClientError as e:
-        print(e)
-        print('Invalid credentials supplied. Let\'s try again :)')
-        return get_imgur_client(read_new_client=True, read_new_token=read_new_token)
 
-    access_token, refresh_token = extract_tokens(access_keys_dict, client, read_new_token)
+def authenticate(read_new_client=False, read_new_token=False, file_path=IMGUR, client_factory=ImgurClient):
+    """Returns the authenticated client and its access keys, the file is only rewritten when they changed."""
+    access_keys_dict = get_access_keys_dict(file_path)
+    client, client_id, client_secret = create_client(access_keys_dict, read_new_client, client_factory=client_factory)
 
-    print("Authentication successful! Here are the details:")
-    print("   Access token:  {0}".format(access_token))
-    print("   Refresh token: {0}".format(refresh_token))
+    access_token, refresh_token, expires_at = extract_tokens(access_keys_dict, client, read_new_token)
+
+    print("Authentication successful!")
     client.set_user_auth(access_token, refresh_token)
 
-    write_access_keys({
+    access_keys = {
         CLIENT_ID: client_id,
         CLIENT_SECRET: client_secret,
         ACCESS_TOKEN: access_token,
-        REFRESH_TOKEN: refresh_token
-    })
+        REFRESH_TOKEN: refresh_token,
+        EXPIRES_AT: expires_at
+    }
+    if access_keys != access_keys_dict:
+        write_access_keys(access_keys, file_path)
+
+    return client, access_keys
+
+
+class ImgurClientProvider:
+    """
+    Keeps one authenticated ImgurClient for the lifetime of the process. The access token is refreshed
+    proactively once it is within `refresh_margin` seconds of expiring (or its expiry is unknown), and the new
+    token is persisted so the next process starts with it.
+    """
+
+    def __init__(self, file_path=IMGUR, client_factory=ImgurClient, refresh_margin=REFRESH_MARGIN):
+        self.__file_path = file_path
+        self.__client_factory = client_factory
+        self.__refresh_margin = refresh_margin
+        self.__client = None
+        self.__access_keys = None
+        self.__lock = threading.Lock()
+
+    def get_client(self) -> ImgurClient:
+        with self.__lock:
+            if self.__client is None:
+                self.__client, self.__access_keys = authenticate(file_path=self.__file_path,
+                                                                 client_factory=self.__client_factory)
+
+            expires_at = self.__access_keys.get(EXPIRES_AT)
+            if expires_at is None or expires_at - time.time() < self.__refresh_margin:
+                self.__refresh_access_token()
+
+            return self.__client
+
+    def invalidate(self):
+        with self.__lock:
+            self.__client = None
+            self.__access_keys = None
+
+    def __refresh_access_token(self):
+        self.__client.auth.refresh()
+        self.__access_keys = dict(self.__access_keys,
+                                  **{ACCESS_TOKEN: self.__client.auth.get_current_access_token(),
+                                     EXPIRES_AT: time.time() + ACCESS_TOKEN_LIFETIME})
+        write_access_keys(self.__access_keys, self.__file_path)
+
+
+SHARED_CLIENT_PROVIDER = ImgurClientProvider()
+
 
-    return client
+def get_cached_imgur_client() -> ImgurClient:
+    return SHARED_CLIENT_PROVIDER.get_client()
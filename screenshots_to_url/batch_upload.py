@@ -0,0 +1,93 @@
+import glob
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from imgurpython.helpers.error import ImgurClientError, ImgurClientRateLimitError
+import requests
+
+from screenshots_to_url.system_utils import copy_to_clipboard
+
+MAX_CONCURRENCY_DEFAULT = 4
+MAX_ATTEMPTS_DEFAULT = 3
+RETRY_DELAY_DEFAULT = 1.0
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif')
+
+# imgurpython does not wrap requests errors, so dropped connections and timeouts are retried as well
+RETRIED_ERRORS = (ImgurClientError, ImgurClientRateLimitError, requests.ConnectionError, requests.Timeout)
+
+UploadResult = namedtuple('UploadResult', ['file_path', 'url', 'error'])
+
+
+def collect_image_paths(folder_or_glob):
+    if os.path.isdir(folder_or_glob):
+        file_paths = [os.path.join(folder_or_glob, file_name) for file_name in os.listdir(folder_or_glob)]
+    else:
+        file_paths = glob.glob(os.path.expanduser(folder_or_glob))
+
+    return sorted(file_path for file_path in file_paths if file_path.lower().endswith(IMAGE_EXTENSIONS))
+
+
+def upload_with_retry(client, file_path, max_attempts=MAX_ATTEMPTS_DEFAULT, retry_delay=RETRY_DELAY_DEFAULT):
+    """Never raises, a file that cannot be uploaded comes back with its error so the rest of the batch goes on."""
+    for attempt in range(max_attempts):
+        try:
+            return UploadResult(file_path=file_path, url=client.upload_from_path(file_path, anon=False)['link'],
+                                error=None)
+        except RETRIED_ERRORS as e:
+            if attempt + 1 == max_attempts:
+                return UploadResult(file_path=file_path, url=None, error=str(e))
+            time.sleep(retry_delay * 2 ** attempt)
+        except Exception as e:
+            # e.g. an unreadable file, retrying will not help
+            return UploadResult(file_path=file_path, url=None, error='{}: {}'.format(type(e).__name__, e))
+
+
+def upload_images(client, file_paths, max_concurrency=MAX_CONCURRENCY_DEFAULT, max_attempts=MAX_ATTEMPTS_DEFAULT,
+                  retry_delay=RETRY_DELAY_DEFAULT):
+    """Uploads on up to `max_concurrency` threads, the results come back in the order of `file_paths`."""
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        return list(executor.map(lambda file_path: upload_with_retry(client, file_path, max_attempts, retry_delay),
+                                 file_paths))
+
+
+def to_markdown(upload_results):
+    return '\n'.join('![{}]({})'.format(os.path.splitext(os.path.basename(upload_result.file_path))[0],
+                                        upload_result.url)
+                     for upload_result in upload_results if upload_result.url is not None)
+
+
+def upload_batch(folder_or_glob, client=None, max_concurrency=MAX_CONCURRENCY_DEFAULT,
+                 max_attempts=MAX_ATTEMPTS_DEFAULT, retry_delay=RETRY_DELAY_DEFAULT):
+    """Uploads every image in a folder (or matching a glob) and copies one Markdown block with all URLs."""
+    if client is None:
+        from screenshots_to_url.auth import get_cached_imgur_client
+        from screenshots_to_url.upload_cache import DeduplicatingImgurClient
+        client = DeduplicatingImgurClient(get_cached_imgur_client())
+
+    upload_results = upload_images(client, collect_image_paths(folder_or_glob), max_concurrency, max_attempts,
+                                   retry_delay)
+    num_failed = len([upload_result for upload_result in upload_results if upload_result.error is not None])
+    for upload_result in upload_results:
+        if upload_result.error is not None:
+            print('Failed to upload {}: {}'.format(upload_result.file_path, upload_result.error))
+
+    copy_to_clipboard(to_markdown(upload_results),
+                      notification_text='Copied {} image URLs to Clipboard ({} failed)'.format(
+                          len(upload_results) - num_failed, num_failed),
+                      notification_title='Batch upload')
+
+    return upload_results
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Upload a folder of screenshots and copy their Markdown URLs')
+    parser.add_argument('folder_or_glob')
+    parser.add_argument('--concurrency', type=int, default=MAX_CONCURRENCY_DEFAULT)
+    parser.add_argument('--attempts', type=int, default=MAX_ATTEMPTS_DEFAULT)
+    arguments = parser.parse_args()
+
+    upload_batch(arguments.folder_or_glob, max_concurrency=arguments.concurrency, max_attempts=arguments.attempts)
@@ -0,0 +1,46 @@
+import json
+import os
+import tempfile
+import time
+from functools import partial
+
+from screenshots_to_url.auth import ImgurClientProvider, get_imgur_client
+from screenshots_to_url.constants import CLIENT_ID, CLIENT_SECRET, ACCESS_TOKEN, REFRESH_TOKEN, EXPIRES_AT
+from screenshots_to_url.fake_imgur_client import FakeImgurClient
+
+NUM_CAPTURES = 10
+REQUEST_LATENCY = 0.2
+
+
+def measure_time_to_first_upload(get_client, image_path):
+    start = time.perf_counter()
+    get_client().upload_from_path(image_path, anon=False)
+    return time.perf_counter() - start
+
+
+# Example usage: python -m screenshots_to_url.benchmark_auth
+with tempfile.TemporaryDirectory() as folder:
+    file_path = os.path.join(folder, '.imgur')
+    with open(file_path, 'w') as credentials_file:
+        json.dump({CLIENT_ID: 'client-id', CLIENT_SECRET: 'client-secret', ACCESS_TOKEN: 'access-token',
+                   REFRESH_TOKEN: 'refresh-token', EXPIRES_AT: time.time() + 7 * 24 * 60 * 60}, credentials_file)
+    image_path = os.path.join(folder, 'capture.png')
+    with open(image_path, 'wb') as image_file:
+        image_file.write(os.urandom(1024))
+
+    client_factory = partial(FakeImgurClient, latency=REQUEST_LATENCY)
+
+    # Before: every capture authenticates from scratch
+    per_capture = [measure_time_to_first_upload(lambda: get_imgur_client(file_path=file_path,
+                                                                         client_factory=client_factory), image_path)
+                   for _ in range(NUM_CAPTURES)]
+
+    # After: one provider for the process, only the first capture authenticates
+    provider = ImgurClientProvider(file_path=file_path, client_factory=client_factory)
+    modified_at = os.path.getmtime(file_path)
+    provided = [measure_time_to_first_upload(provider.get_client, image_path) for _ in range(NUM_CAPTURES)]
+    assert os.path.getmtime(file_path) == modified_at, 'Unchanged credentials must not be rewritten'
+
+    print('authenticate per capture = {:6.1f} ms per capture'.format(1000 * sum(per_capture) / NUM_CAPTURES))
+    print('cached provider          = {:6.1f} ms first capture, {:6.1f} ms after'.format(
+        1000 * provided[0], 1000 * sum(provided[1:]) / (NUM_CAPTURES - 1)))
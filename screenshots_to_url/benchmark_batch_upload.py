@@ -0,0 +1,38 @@
+import os
+import tempfile
+import time
+
+from screenshots_to_url.batch_upload import collect_image_paths, to_markdown, upload_images
+from screenshots_to_url.fake_imgur_client import FakeImgurClient
+
+NUM_IMAGES = 20
+UPLOAD_LATENCY = 0.2
+
+
+def create_images(folder):
+    for index in range(NUM_IMAGES):
+        with open(os.path.join(folder, 'capture-{:02}.png'.format(index)), 'wb') as image_file:
+            image_file.write(os.urandom(1024))
+
+
+def measure(client, file_paths, max_concurrency):
+    start = time.perf_counter()
+    upload_results = upload_images(client, file_paths, max_concurrency=max_concurrency, retry_delay=0.01)
+    return time.perf_counter() - start, upload_results
+
+
+# Example usage: python -m screenshots_to_url.benchmark_batch_upload
+with tempfile.TemporaryDirectory() as folder:
+    create_images(folder)
+    file_paths = collect_image_paths(folder)
+
+    for max_concurrency in [1, 4, 8]:
+        # Every third image fails once and succeeds on the retry
+        client = FakeImgurClient(latency=UPLOAD_LATENCY, failures={file_path: 1 for file_path in file_paths[::3]})
+        duration, upload_results = measure(client, file_paths, max_concurrency)
+
+        assert [upload_result.file_path for upload_result in upload_results] == file_paths
+        assert all(upload_result.url is not None for upload_result in upload_results)
+        print('concurrency = {}   {} images in {:.2f} s'.format(max_concurrency, len(upload_results), duration))
+
+    print(to_markdown(upload_results[:3]))
@@ -0,0 +1,50 @@
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from screenshots_to_url.daemon import ScreenshotDaemon, ScreenshotService, send_job, CAPTURE
+from screenshots_to_url.fake_imgur_client import FakeImgurClient
+
+NUM_CAPTURES = 10
+
+# Stands in for `screencapture -i` on any OS, writes a tiny image to the path it is given
+FAKE_CAPTURE_COMMAND = [sys.executable, '-c', 'import os, sys; open(sys.argv[1], "wb").write(os.urandom(1024))']
+
+# What every capture used to pay before doing any work: a fresh interpreter importing the flow
+COLD_START_COMMAND = [sys.executable, '-c', 'import imgurpython, pyperclip, screenshots_to_url.auth, '
+                                            'screenshots_to_url.system_utils']
+
+
+def measure_cold_start():
+    start = time.perf_counter()
+    subprocess.run(COLD_START_COMMAND, check=True, env=dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path)))
+    return time.perf_counter() - start
+
+
+# Example usage: python -m screenshots_to_url.benchmark_daemon
+with tempfile.TemporaryDirectory() as folder:
+    socket_path = os.path.join(folder, 'daemon.sock')
+    client = FakeImgurClient()
+    service = ScreenshotService(get_client=lambda: client, capture_command=FAKE_CAPTURE_COMMAND,
+                                copy=lambda text: None, screenshot_dir=folder)
+
+    with ScreenshotDaemon(service, socket_path) as daemon:
+        threading.Thread(target=daemon.serve_forever, daemon=True).start()
+
+        round_trips = []
+        for _ in range(NUM_CAPTURES):
+            start = time.perf_counter()
+            result = send_job({'job': CAPTURE}, socket_path)
+            round_trips.append(time.perf_counter() - start)
+            assert result['url'] is not None, result
+        daemon.shutdown()
+
+    assert os.listdir(folder) == [], 'Captured files must be cleaned up'
+
+print('{:<34} = {:7.1f} ms per capture'.format('cold interpreter + imports', 1000 * measure_cold_start()))
+print('{:<34} = {:7.1f} ms per capture'.format('daemon round trip (incl. capture)',
+                                               1000 * sum(round_trips) / NUM_CAPTURES))
+print('{:<34} = {}'.format('last stage timings (ms)', result['timings']))
@@ -0,0 +1,49 @@
+import os
+import tempfile
+import time
+
+from screenshots_to_url.fake_imgur_client import FakeImgurClient
+from screenshots_to_url.upload_cache import DeduplicatingImgurClient, UploadIndex
+
+NUM_REPETITIONS = 20
+UPLOAD_LATENCY = 0.3
+IMAGE_SIZE = 2 * 1024 * 1024
+
+
+def measure(upload):
+    start = time.perf_counter()
+    for _ in range(NUM_REPETITIONS):
+        upload()
+    return (time.perf_counter() - start) / NUM_REPETITIONS
+
+
+# Example usage: python -m screenshots_to_url.benchmark_upload_cache
+with tempfile.TemporaryDirectory() as folder:
+    image_path = os.path.join(folder, 'capture.png')
+    with open(image_path, 'wb') as image_file:
+        image_file.write(os.urandom(IMAGE_SIZE))
+
+    fake_client = FakeImgurClient(latency=UPLOAD_LATENCY)
+    upload_index = UploadIndex(os.path.join(folder, 'uploads.sqlite'))
+    client = DeduplicatingImgurClient(fake_client, upload_index)
+
+    print('{:<24} = {:7.1f} ms'.format('upload', 1000 * measure(lambda: fake_client.upload_from_path(image_path))))
+
+    link = client.upload_from_path(image_path)['link']
+    print('{:<24} = {:7.1f} ms'.format('cache hit (hash + index)',
+                                       1000 * measure(lambda: client.upload_from_path(image_path))))
+    assert client.upload_from_path(image_path)['link'] == link
+
+    # A deleted remote image is noticed on validation and uploaded again
+    fake_client.delete_image(client.upload_from_path(image_path)['id'])
+    revalidating_client = DeduplicatingImgurClient(fake_client, upload_index, validate_after=0)
+    assert revalidating_client.upload_from_path(image_path)['link'] != link
+
+    # Anonymous and account uploads of the same file are cached apart, uploads with a config are never cached
+    misses = revalidating_client.misses
+    account_link = revalidating_client.upload_from_path(image_path, anon=False)['link']
+    assert revalidating_client.upload_from_path(image_path, anon=False)['link'] == account_link
+    assert revalidating_client.upload_from_path(image_path)['link'] not in (account_link, link)
+    revalidating_client.upload_from_path(image_path, config={'title': 'capture'})
+    assert revalidating_client.misses == misses + 1
+    upload_index.close()
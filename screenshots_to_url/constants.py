@@ -4,4 +4,7 @@ CLIENT_ID = 'client_id'
 CLIENT_SECRET = 'client_secret'
 ACCESS_TOKEN = 'access_token'
 REFRESH_TOKEN = 'refresh_token'
+EXPIRES_AT = 'expires_at'
 IMGUR = f'{str(Path.home())}/.imgur'
+UPLOAD_INDEX = f'{str(Path.home())}/.imgur_uploads.sqlite'
+DAEMON_SOCKET = f'{str(Path.home())}/.screenshots_to_url.sock'
@@ -0,0 +1,152 @@
+import json
+import os
+import socket
+import socketserver
+import tempfile
+import time
+from contextlib import contextmanager
+
+from screenshots_to_url.auth import get_cached_imgur_client
+from screenshots_to_url.constants import DAEMON_SOCKET
+from screenshots_to_url.hash_utils import generate_random_string_of_length
+from screenshots_to_url.system_utils import SCREENCAPTURE_COMMAND, copy_to_clipboard, is_file, remove_file, \
+    take_screenshot
+from screenshots_to_url.upload_cache import DeduplicatingImgurClient, UploadIndex
+
+CAPTURE = 'capture'
+UPLOAD = 'upload'
+MAX_MESSAGE_SIZE = 64 * 1024
+
+
+class StageTimer:
+
+    def __init__(self):
+        self.timings = {}
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = round(1000 * (time.perf_counter() - start), 3)
+
+
+class ScreenshotService:
+    """
+    The capture -> upload -> clipboard -> cleanup flow with everything expensive (imports, the authenticated
+    client, the upload index) created once. Each job returns the URL and how many milliseconds every stage took.
+
+    `capture_command` is run as `[*capture_command, file_path]`, e.g. a script writing a fixed image on Linux.
+    """
+
+    def __init__(self, get_client=get_cached_imgur_client, capture_command=SCREENCAPTURE_COMMAND,
+                 copy=copy_to_clipboard, screenshot_dir=None):
+        self.__get_client = get_client
+        self.__capture_command = capture_command
+        self.__copy = copy
+        self.__screenshot_dir = screenshot_dir or tempfile.gettempdir()
+
+    def capture(self):
+        stage_timer = StageTimer()
+        file_path = os.path.join(self.__screenshot_dir, '{}.png'.format(generate_random_string_of_length()))
+
+        try:
+            with stage_timer.stage('capture'):
+                take_screenshot(file_path, self.__capture_command)
+            if not is_file(file_path):
+                # The user cancelled the interactive capture
+                return {'url': None, 'error': 'No screenshot taken', 'timings': stage_timer.timings}
+
+            return self.__upload(file_path, stage_timer)
+        finally:
+            with stage_timer.stage('cleanup'):
+                remove_file(file_path)
+
+    def upload(self, file_path):
+        return self.__upload(file_path, StageTimer())
+
+    def __upload(self, file_path, stage_timer):
+        with stage_timer.stage('client'):
+            client = self.__get_client()
+        with stage_timer.stage('upload'):
+            url = client.upload_from_path(file_path, anon=False)['link']
+        with stage_timer.stage('clipboard'):
+            self.__copy(url)
+
+        return {'url': url, 'error': None, 'timings': stage_timer.timings}
+
+
+class ScreenshotJobHandler(socketserver.StreamRequestHandler):
+    # One JSON job per line in, one JSON result per line out
+
+    def handle(self):
+        for line in self.rfile:
+            try:
+                job = json.loads(line)
+                if job.get('job') == CAPTURE:
+                    result = self.server.service.capture()
+                elif job.get('job') == UPLOAD:
+                    result = self.server.service.upload(job['file_path'])
+                else:
+                    result = {'url': None, 'error': 'Unknown job {}'.format(job.get('job')), 'timings': {}}
+            except Exception as e:
+                result = {'url': None, 'error': '{}: {}'.format(type(e).__name__, e), 'timings': {}}
+
+            print('{} -> {}'.format(line.decode().strip(), result))
+            self.wfile.write((json.dumps(result) + '\n').encode())
+
+
+class ScreenshotDaemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, service: ScreenshotService, socket_path=DAEMON_SOCKET):
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        super().__init__(socket_path, ScreenshotJobHandler)
+        os.chmod(socket_path, 0o600)
+        self.service = service
+        self.socket_path = socket_path
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+
+def send_job(job, socket_path=DAEMON_SOCKET, timeout=None):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.settimeout(timeout)
+        connection.connect(socket_path)
+        with connection.makefile('rwb') as stream:
+            stream.write((json.dumps(job) + '\n').encode())
+            stream.flush()
+            return json.loads(stream.readline(MAX_MESSAGE_SIZE))
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Resident screenshot to URL daemon and its client')
+    parser.add_argument('command', choices=['serve', CAPTURE, UPLOAD])
+    parser.add_argument('file_path', nargs='?')
+    parser.add_argument('--socket', default=DAEMON_SOCKET)
+    parser.add_argument('--capture-command', nargs='+', default=SCREENCAPTURE_COMMAND)
+    arguments = parser.parse_args()
+
+    if arguments.command == 'serve':
+        # One upload index (one SQLite connection) for the daemon's lifetime, the wrapper per job is just a view on it
+        upload_index = UploadIndex()
+        screenshot_service = ScreenshotService(
+            get_client=lambda: DeduplicatingImgurClient(get_cached_imgur_client(), upload_index),
+            capture_command=arguments.capture_command)
+        # Authenticate up front so the first capture is already warm
+        get_cached_imgur_client()
+        try:
+            with ScreenshotDaemon(screenshot_service, arguments.socket) as daemon:
+                print('Listening on {}'.format(arguments.socket))
+                daemon.serve_forever()
+        finally:
+            upload_index.close()
+    else:
+        print(send_job({'job': arguments.command, 'file_path': arguments.file_path}, arguments.socket))
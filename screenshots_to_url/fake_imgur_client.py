@@ -0,0 +1,72 @@
+import threading
+import time
+
+from imgurpython.helpers.error import ImgurClientError, ImgurClientRateLimitError
+
+
+class FakeAuth:
+
+    def __init__(self, access_token, refresh_token, latency=0.0):
+        self.current_access_token = access_token
+        self.refresh_token = refresh_token
+        self.latency = latency
+        self.refresh_count = 0
+
+    def get_current_access_token(self):
+        return self.current_access_token
+
+    def refresh(self):
+        time.sleep(self.latency)
+        self.refresh_count += 1
+        self.current_access_token = 'refreshed-access-token-{}'.format(self.refresh_count)
+
+
+class FakeImgurClient:
+    """
+    Stands in for ImgurClient in tests and benchmarks. Every upload takes `latency` seconds and returns a link
+    derived from the upload count. `failures` maps a file path to how many of its uploads fail first,
+    with an ImgurClientRateLimitError when `rate_limited` is set and an ImgurClientError otherwise.
+    Construction takes `latency` too, like the credits request ImgurClient makes in its constructor.
+    """
+
+    def __init__(self, latency=0.0, failures=None, rate_limited=False, client_id=None, client_secret=None):
+        time.sleep(latency)
+        self.latency = latency
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.auth = None
+        self.uploaded_paths = []
+        self.deleted_image_ids = []
+        self.__failures = dict(failures or {})
+        self.__rate_limited = rate_limited
+        self.__lock = threading.Lock()
+
+    def set_user_auth(self, access_token, refresh_token):
+        self.auth = FakeAuth(access_token, refresh_token, self.latency)
+
+    def upload_from_path(self, path, config=None, anon=True):
+        time.sleep(self.latency)
+
+        with self.__lock:
+            if self.__failures.get(path, 0) > 0:
+                self.__failures[path] -= 1
+                if self.__rate_limited:
+                    raise ImgurClientRateLimitError()
+                raise ImgurClientError('Fake upload failure', 500)
+
+            self.uploaded_paths.append(path)
+            image_id = 'fake{}'.format(len(self.uploaded_paths))
+
+        return {'id': image_id, 'link': 'https://i.imgur.com/{}.png'.format(image_id)}
+
+    def get_image(self, image_id):
+        with self.__lock:
+            if image_id in self.deleted_image_ids:
+                raise ImgurClientError('Unable to find an image with the id, {}'.format(image_id), 404)
+
+        return {'id': image_id, 'link': 'https://i.imgur.com/{}.png'.format(image_id)}
+
+    def delete_image(self, image_id):
+        with self.__lock:
+            self.deleted_image_ids.append(image_id)
+        return True
@@ -1,7 +1,18 @@
+import hashlib
 import string
 import random
 
 
 def generate_random_string_of_length(string_length=10):
     letters = string.ascii_lowercase
-    return ''.join(random.choice(letters) for i in range(string_length))
\ No newline at end of file
+    return ''.join(random.choice(letters) for i in range(string_length))
+
+
+def hash_file(file_path, chunk_size=1024 * 1024):
+    """SHA-256 of the file contents, read in chunks so large images are never fully loaded."""
+    file_hash = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            file_hash.update(chunk)
+
+    return file_hash.hexdigest()
@@ -1,9 +1,15 @@
 import os
+import subprocess
+import sys
+
 import pyperclip
 
+SCREENCAPTURE_COMMAND = ['screencapture', '-i']
+
 
-def take_screenshot(file_path):
-    os.system(f'screencapture -i {file_path}')
+def take_screenshot(file_path, capture_command=SCREENCAPTURE_COMMAND):
+    # The file path is passed as its own argument, nothing goes through a shell
+    subprocess.run([*capture_command, file_path], check=False)
 
 
 def is_file(file_path):
@@ -12,18 +18,21 @@ def is_file(file_path):
 
 def remove_file(file_path):
     if is_file(file_path):
-        os.system(f'rm {file_path}')
+        os.remove(file_path)
+
+
+def escape_applescript_string(text):
+    return text.replace('\\', '\\\\').replace('"', '\\"')
 
 
 def display_notification(text, title):
-    osascript = f'''
-            osascript <<EOF
-            display notification "{text}" with title "{title}"
-            EOF
-        '''
-    os.system(osascript)
+    if sys.platform != 'darwin':
+        return
+
+    subprocess.run(['osascript', '-e', 'display notification "{}" with title "{}"'.format(
+        escape_applescript_string(text), escape_applescript_string(title))], check=False)
 
 
-def copy_to_clipboard(text):
-    display_notification(text=f'Copied \'{text}\' to Clipboard', title=text)
+def copy_to_clipboard(text, notification_text=None, notification_title=None):
+    display_notification(text=notification_text or f'Copied \'{text}\' to Clipboard', title=notification_title or text)
     pyperclip.copy(text)
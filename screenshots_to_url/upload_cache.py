@@ -0,0 +1,136 @@
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+from imgurpython.helpers.error import ImgurClientError, ImgurClientRateLimitError
+from requests import RequestException
+
+from screenshots_to_url.constants import UPLOAD_INDEX
+from screenshots_to_url.hash_utils import hash_file
+
+# Cached links are re-checked against Imgur at most once a day
+VALIDATE_AFTER_DEFAULT = 24 * 60 * 60
+MAX_ENTRIES_DEFAULT = 10000
+NOT_FOUND = 404
+
+UploadEntry = namedtuple('UploadEntry', ['upload_key', 'image_id', 'link', 'uploaded_at', 'validated_at'])
+
+
+def get_upload_key(content_hash, anon=True, client_id=None):
+    """The same file uploaded anonymously and to an account are two different images, each cached on its own."""
+    return 'anon:{}'.format(content_hash) if anon else 'account:{}:{}'.format(client_id, content_hash)
+
+
+class UploadIndex:
+    """
+    Persistent upload key (see get_upload_key) -> uploaded image index, a small SQLite file next to the ~/.imgur
+    credentials. The key column is still called content_hash so existing index files keep working, their entries
+    keyed by the bare hash are never hit again and age out as least recently used.
+    """
+
+    def __init__(self, file_path=UPLOAD_INDEX, max_entries=MAX_ENTRIES_DEFAULT):
+        self.__max_entries = max_entries
+        self.__lock = threading.Lock()
+        self.__connection = sqlite3.connect(file_path, check_same_thread=False)
+        with self.__connection:
+            self.__connection.execute('''
+                CREATE TABLE IF NOT EXISTS uploads (
+                    content_hash TEXT PRIMARY KEY,
+                    image_id TEXT NOT NULL,
+                    link TEXT NOT NULL,
+                    uploaded_at REAL NOT NULL,
+                    validated_at REAL NOT NULL,
+                    last_used_at REAL NOT NULL
+                )''')
+
+    def get(self, upload_key):
+        with self.__lock, self.__connection:
+            row = self.__connection.execute(
+                'SELECT content_hash, image_id, link, uploaded_at, validated_at FROM uploads WHERE content_hash = ?',
+                (upload_key,)).fetchone()
+            if row is not None:
+                self.__connection.execute('UPDATE uploads SET last_used_at = ? WHERE content_hash = ?',
+                                          (time.time(), upload_key))
+
+        return UploadEntry(*row) if row is not None else None
+
+    def put(self, upload_key, image_id, link):
+        now = time.time()
+        with self.__lock, self.__connection:
+            self.__connection.execute('INSERT OR REPLACE INTO uploads VALUES (?, ?, ?, ?, ?, ?)',
+                                      (upload_key, image_id, link, now, now, now))
+            # Least recently used entries go first once the index is full
+            self.__connection.execute('''
+                DELETE FROM uploads WHERE content_hash IN (
+                    SELECT content_hash FROM uploads ORDER BY last_used_at DESC LIMIT -1 OFFSET ?
+                )''', (self.__max_entries,))
+
+    def mark_validated(self, upload_key):
+        with self.__lock, self.__connection:
+            self.__connection.execute('UPDATE uploads SET validated_at = ? WHERE content_hash = ?',
+                                      (time.time(), upload_key))
+
+    def remove(self, upload_key):
+        with self.__lock, self.__connection:
+            self.__connection.execute('DELETE FROM uploads WHERE content_hash = ?', (upload_key,))
+
+    def close(self):
+        self.__connection.close()
+
+
+class DeduplicatingImgurClient:
+    """
+    Wraps an ImgurClient so `upload_from_path` returns the existing link when the same file contents were uploaded
+    before the same way: anonymously, or to the account of the same client_id. Uploads with a `config` (album, title,
+    description) always go to Imgur and are not cached.
+
+    Entries older than `validate_after` seconds are checked with `get_image` first, and dropped and uploaded again
+    when Imgur no longer has the image (404). Any other error keeps the cached link, unvalidated.
+    Everything else is delegated to the wrapped client.
+    """
+
+    def __init__(self, client, upload_index: UploadIndex = None, validate_after=VALIDATE_AFTER_DEFAULT):
+        self.__client = client
+        self.__upload_index = upload_index if upload_index is not None else UploadIndex()
+        self.__validate_after = validate_after
+        self.hits = 0
+        self.misses = 0
+
+    def __getattr__(self, name):
+        return getattr(self.__client, name)
+
+    def upload_from_path(self, path, config=None, anon=True):
+        if config is not None:
+            return self.__client.upload_from_path(path, config=config, anon=anon)
+
+        upload_key = get_upload_key(hash_file(path), anon, getattr(self.__client, 'client_id', None))
+
+        upload_entry = self.__upload_index.get(upload_key)
+        if upload_entry is not None and self.__is_still_uploaded(upload_entry):
+            self.hits += 1
+            return {'id': upload_entry.image_id, 'link': upload_entry.link}
+
+        self.misses += 1
+        image = self.__client.upload_from_path(path, config=config, anon=anon)
+        self.__upload_index.put(upload_key, image['id'], image['link'])
+
+        return image
+
+    def __is_still_uploaded(self, upload_entry: UploadEntry):
+        if time.time() - upload_entry.validated_at < self.__validate_after:
+            return True
+
+        try:
+            self.__client.get_image(upload_entry.image_id)
+        except ImgurClientError as e:
+            if e.status_code != NOT_FOUND:
+                # Imgur is having trouble, that says nothing about the image, so keep the link and check it next time
+                return True
+            self.__upload_index.remove(upload_entry.upload_key)
+            return False
+        except (ImgurClientRateLimitError, RequestException):
+            return True
+
+        self.__upload_index.mark_validated(upload_entry.upload_key)
+        return True
@@ -0,0 +1,47 @@
+import time
+
+import numpy as np
+
+from classification_metrics import ZeroDivisionPolicy, confusion_counts, f_beta
+
+NUM_MODELS = 1000
+NUM_THRESHOLDS = 1000
+NUM_OBSERVATIONS = 100
+BETA = 0.5
+
+
+def f_score(precision, recall, beta):
+    # Same formula as f_score.f_score, which cannot be imported since f_score.py runs its examples on import
+    return (1 + beta ** 2) * precision * recall / (beta ** 2 * precision + recall)
+
+
+def f_score_loop(true_positive, false_positive, false_negative):
+    scores = []
+    for tp, fp, fn in zip(true_positive.tolist(), false_positive.tolist(), false_negative.tolist()):
+        try:
+            scores.append(f_score(precision=tp / (tp + fp), recall=tp / (tp + fn), beta=BETA))
+        except ZeroDivisionError:
+            scores.append(0.0)
+    return np.array(scores)
+
+
+# Example usage: python statistics/benchmark_classification_metrics.py
+random_generator = np.random.default_rng(42)
+shape = (NUM_MODELS, NUM_THRESHOLDS)
+true_positive = random_generator.integers(0, 3, shape)
+false_positive = random_generator.integers(0, NUM_OBSERVATIONS - 2, shape)
+false_negative = 2 - true_positive
+counts = confusion_counts(true_positive, false_positive, false_negative,
+                          NUM_OBSERVATIONS - true_positive - false_positive - false_negative)
+
+start = time.perf_counter()
+loop_scores = f_score_loop(true_positive.ravel(), false_positive.ravel(), false_negative.ravel())
+loop_duration = time.perf_counter() - start
+
+start = time.perf_counter()
+vectorized_scores = f_beta(counts, beta=BETA, zero_division=ZeroDivisionPolicy.ZERO)
+vectorized_duration = time.perf_counter() - start
+
+assert np.allclose(loop_scores.reshape(shape), vectorized_scores)
+print('{:,} F-beta scores: python loop = {:.3f} s   vectorized = {:.4f} s'.format(
+    NUM_MODELS * NUM_THRESHOLDS, loop_duration, vectorized_duration))
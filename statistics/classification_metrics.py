@@ -0,0 +1,131 @@
+from collections import namedtuple
+from enum import Enum
+
+import numpy as np
+
+# Every field is an array, all of the same shape, e.g. (num_models, num_thresholds)
+ConfusionCounts = namedtuple('ConfusionCounts', ['true_positive', 'false_positive', 'false_negative', 'true_negative'])
+
+
+class ZeroDivisionPolicy(Enum):
+    NAN = 'NAN'
+    ZERO = 'ZERO'
+    ONE = 'ONE'
+
+
+ZERO_DIVISION_VALUES = {
+    ZeroDivisionPolicy.NAN: np.nan,
+    ZeroDivisionPolicy.ZERO: 0.0,
+    ZeroDivisionPolicy.ONE: 1.0,
+}
+
+
+def safe_divide(numerator, denominator, zero_division=ZeroDivisionPolicy.ZERO):
+    """Element-wise numerator / denominator, with the value chosen by `zero_division` wherever denominator == 0."""
+    numerator, denominator = np.broadcast_arrays(np.asarray(numerator, dtype=float),
+                                                 np.asarray(denominator, dtype=float))
+    result = np.full(numerator.shape, ZERO_DIVISION_VALUES[zero_division])
+    np.divide(numerator, denominator, out=result, where=denominator != 0)
+
+    return result
+
+
+def confusion_counts(true_positive, false_positive, false_negative, true_negative):
+    return ConfusionCounts(*np.broadcast_arrays(*[np.asarray(count, dtype=np.int64) for count in
+                                                  [true_positive, false_positive, false_negative, true_negative]]))
+
+
+def confusion_counts_from_predictions(labels, predictions):
+    """
+    `labels` are 0/1 of shape (n,), `predictions` 0/1 of shape (..., n), e.g. one row per model.
+    Returns counts of shape (...).
+    """
+    labels = np.asarray(labels, dtype=bool)
+    predictions = np.asarray(predictions, dtype=bool)
+
+    true_positive = np.count_nonzero(predictions & labels, axis=-1)
+    false_positive = np.count_nonzero(predictions & ~labels, axis=-1)
+    num_positive = np.count_nonzero(labels)
+
+    return confusion_counts(true_positive, false_positive, num_positive - true_positive,
+                            len(labels) - num_positive - false_positive)
+
+
+def confusion_counts_at_thresholds(labels, scores, thresholds):
+    """
+    Counts for predicting positive whenever score >= threshold, for every threshold at once.
+    `scores` of shape (n,) gives counts of the shape of `thresholds`, (num_models, n) gives (num_models, *thresholds).
+    Each model is sorted once, every threshold is then a binary search.
+    """
+    labels = np.asarray(labels, dtype=bool)
+    scores = np.asarray(scores, dtype=float)
+    thresholds = np.asarray(thresholds, dtype=float)
+
+    if scores.ndim > 1:
+        counts = [confusion_counts_at_thresholds(labels, model_scores, thresholds) for model_scores in scores]
+        return ConfusionCounts(*[np.stack(count_arrays) for count_arrays in zip(*counts)])
+
+    positive_scores = np.sort(scores[labels])
+    negative_scores = np.sort(scores[~labels])
+    true_positive = len(positive_scores) - np.searchsorted(positive_scores, thresholds, side='left')
+    false_positive = len(negative_scores) - np.searchsorted(negative_scores, thresholds, side='left')
+
+    return confusion_counts(true_positive, false_positive, len(positive_scores) - true_positive,
+                            len(negative_scores) - false_positive)
+
+
+def one_vs_rest_confusion_counts(labels, predictions, num_classes):
+    """Per-class counts of shape (num_classes,) for integer class `labels` and `predictions`."""
+    labels = np.asarray(labels)
+    predictions = np.asarray(predictions)
+
+    true_positive = np.bincount(labels[labels == predictions], minlength=num_classes)
+    num_predicted = np.bincount(predictions, minlength=num_classes)
+    num_actual = np.bincount(labels, minlength=num_classes)
+
+    return confusion_counts(true_positive, num_predicted - true_positive, num_actual - true_positive,
+                            len(labels) - num_predicted - num_actual + true_positive)
+
+
+def precision(counts: ConfusionCounts, zero_division=ZeroDivisionPolicy.ZERO):
+    return safe_divide(counts.true_positive, counts.true_positive + counts.false_positive, zero_division)
+
+
+def recall(counts: ConfusionCounts, zero_division=ZeroDivisionPolicy.ZERO):
+    return safe_divide(counts.true_positive, counts.true_positive + counts.false_negative, zero_division)
+
+
+def accuracy(counts: ConfusionCounts, zero_division=ZeroDivisionPolicy.ZERO):
+    return safe_divide(counts.true_positive + counts.true_negative, sum(counts), zero_division)
+
+
+def f_beta(counts: ConfusionCounts, beta=1.0, zero_division=ZeroDivisionPolicy.ZERO):
+    """
+    Same value as f_score(precision, recall, beta), computed from the counts directly:
+    (1 + beta^2) TP / ((1 + beta^2) TP + beta^2 FN + FP). It is only undefined when TP = FP = FN = 0,
+    so a model that finds nothing scores 0 instead of NaN. `beta` may be an array broadcast against the counts.
+    """
+    beta_squared = np.asarray(beta, dtype=float) ** 2
+    weighted_true_positive = (1 + beta_squared) * counts.true_positive
+
+    return safe_divide(weighted_true_positive,
+                       weighted_true_positive + beta_squared * counts.false_negative + counts.false_positive,
+                       zero_division)
+
+
+def get_metrics(counts: ConfusionCounts, beta=1.0, zero_division=ZeroDivisionPolicy.ZERO):
+    return {
+        'precision': precision(counts, zero_division),
+        'recall': recall(counts, zero_division),
+        'f_beta': f_beta(counts, beta, zero_division),
+        'accuracy': accuracy(counts, zero_division),
+    }
+
+
+if __name__ == '__main__':
+    # The three models from f_score.py: all negative, some rare positives right, all positive
+    counts = confusion_counts(true_positive=[0, 1, 2], false_positive=[0, 2, 98], false_negative=[2, 1, 0],
+                              true_negative=[98, 96, 0])
+
+    for zero_division in ZeroDivisionPolicy:
+        print(zero_division.value, get_metrics(counts, beta=1.0, zero_division=zero_division))
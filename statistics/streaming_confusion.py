@@ -0,0 +1,124 @@
+import numpy as np
+
+from classification_metrics import ZeroDivisionPolicy, confusion_counts, f_beta, precision, recall
+
+NUM_BINS_DEFAULT = 1000
+CHUNK_SIZE_DEFAULT = 1_000_000
+
+# Structured dtype of the prediction log files read by iter_npy_chunks
+PREDICTION_DTYPE = np.dtype([('label', np.uint8), ('score', np.float32)])
+
+
+class ConfusionAccumulator:
+    """
+    Per-threshold confusion counts over a stream of (label, score) chunks. Scores are binned into a histogram per
+    class, so memory is O(num_bins) however many observations go through. Thresholds are the lower bin edges and
+    predicting positive means score >= threshold, which makes the counts exact at every threshold. Scores outside
+    [low, high) land in the first or last bin.
+
+    Accumulators over the same bins (e.g. one per worker) combine with `merge`.
+    """
+
+    def __init__(self, num_bins=NUM_BINS_DEFAULT, low=0.0, high=1.0, bin_edges=None):
+        self.bin_edges = np.asarray(bin_edges, dtype=float) if bin_edges is not None \
+            else np.linspace(low, high, num_bins + 1)
+        self.positive_counts = np.zeros(len(self.bin_edges) - 1, dtype=np.int64)
+        self.negative_counts = np.zeros(len(self.bin_edges) - 1, dtype=np.int64)
+
+    @property
+    def thresholds(self):
+        return self.bin_edges[:-1]
+
+    def update(self, labels, scores):
+        labels = np.asarray(labels, dtype=bool)
+        bins = np.searchsorted(self.bin_edges, scores, side='right') - 1
+        np.clip(bins, 0, len(self.positive_counts) - 1, out=bins)
+
+        self.positive_counts += np.bincount(bins[labels], minlength=len(self.positive_counts))
+        self.negative_counts += np.bincount(bins[~labels], minlength=len(self.negative_counts))
+
+        return self
+
+    def update_from_chunks(self, chunks):
+        for labels, scores in chunks:
+            self.update(labels, scores)
+
+        return self
+
+    def merge(self, other):
+        if not np.array_equal(self.bin_edges, other.bin_edges):
+            raise ValueError('Cannot merge ConfusionAccumulators with different bin edges')
+
+        self.positive_counts += other.positive_counts
+        self.negative_counts += other.negative_counts
+
+        return self
+
+    def confusion_counts(self):
+        # Everything in bin i or above is predicted positive at threshold i
+        true_positive = np.cumsum(self.positive_counts[::-1])[::-1]
+        false_positive = np.cumsum(self.negative_counts[::-1])[::-1]
+
+        return confusion_counts(true_positive, false_positive, self.positive_counts.sum() - true_positive,
+                                self.negative_counts.sum() - false_positive)
+
+    def precision_recall_curve(self, zero_division=ZeroDivisionPolicy.ONE):
+        """(thresholds, precision, recall), precision of an empty prediction set defaults to 1 as usual for PR."""
+        counts = self.confusion_counts()
+        return self.thresholds, precision(counts, zero_division), recall(counts, ZeroDivisionPolicy.ZERO)
+
+    def f_beta_curve(self, beta=1.0, zero_division=ZeroDivisionPolicy.ZERO):
+        return self.thresholds, f_beta(self.confusion_counts(), beta, zero_division)
+
+
+def iter_array_chunks(labels, scores, chunk_size=CHUNK_SIZE_DEFAULT):
+    """Chunks of two equally long arrays, np.memmap included, so only one chunk is paged in at a time."""
+    for start in range(0, len(labels), chunk_size):
+        yield np.asarray(labels[start:start + chunk_size]), np.asarray(scores[start:start + chunk_size])
+
+
+def iter_npy_chunks(file_path, chunk_size=CHUNK_SIZE_DEFAULT, start=0, end=None):
+    """Chunks of rows [start, end) of a memory-mapped .npy prediction log with PREDICTION_DTYPE."""
+    predictions = np.load(file_path, mmap_mode='r')
+    end = len(predictions) if end is None else min(end, len(predictions))
+
+    for chunk_start in range(start, end, chunk_size):
+        chunk = predictions[chunk_start:min(chunk_start + chunk_size, end)]
+        yield chunk['label'], chunk['score']
+
+
+def accumulate_npy_range(file_path, start, end, bin_edges, chunk_size=CHUNK_SIZE_DEFAULT):
+    # Module-level so a process pool can run one per shard of the file
+    return ConfusionAccumulator(bin_edges=bin_edges).update_from_chunks(
+        iter_npy_chunks(file_path, chunk_size, start, end))
+
+
+if __name__ == '__main__':
+    import os
+    import tempfile
+    from concurrent.futures import ProcessPoolExecutor
+
+    num_observations = 5_000_000
+    num_shards = 4
+    random_generator = np.random.default_rng(42)
+
+    # 2% positives like the rare-positive examples in f_score.py, positives score higher on average
+    predictions = np.empty(num_observations, dtype=PREDICTION_DTYPE)
+    predictions['label'] = random_generator.random(num_observations) < 0.02
+    predictions['score'] = np.clip(random_generator.normal(0.3 + 0.4 * predictions['label'], 0.15), 0, 1)
+
+    with tempfile.TemporaryDirectory() as directory:
+        file_path = os.path.join(directory, 'predictions.npy')
+        np.save(file_path, predictions)
+
+        accumulator = ConfusionAccumulator()
+        shard_size = -(-num_observations // num_shards)
+        with ProcessPoolExecutor() as executor:
+            shards = [executor.submit(accumulate_npy_range, file_path, start, start + shard_size,
+                                      accumulator.bin_edges) for start in range(0, num_observations, shard_size)]
+            for shard in shards:
+                accumulator.merge(shard.result())
+
+    thresholds, f_scores = accumulator.f_beta_curve(beta=1.0)
+    best = np.argmax(f_scores)
+    print('Best threshold = {:.3f}   F1 = {:.4f}'.format(thresholds[best], f_scores[best]))
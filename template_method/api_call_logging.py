@@ -0,0 +1,100 @@
+import logging
+import logging.handlers
+import queue
+from collections import namedtuple
+
+LOGGER_NAME = 'template_method.bitmex_api'
+MAX_QUEUE_SIZE_DEFAULT = 10000
+
+STRUCTURED_FORMAT = '%(asctime)s %(levelname)s %(name)s %(message)s'
+
+# Attached to every per-call log record as `record.api_call`
+ApiCallRecord = namedtuple('ApiCallRecord', ['api_name', 'status_code', 'duration', 'retry_count', 'time_of_call',
+                                             'error_message'])
+
+LOGGER = logging.getLogger(LOGGER_NAME)
+
+
+def log_api_call_record(api_call_record: ApiCallRecord):
+    level = logging.WARNING if api_call_record.error_message else logging.INFO
+    if not LOGGER.isEnabledFor(level):
+        return
+
+    LOGGER.log(level, 'api_name=%s status=%s duration_ms=%.1f retry_count=%d error=%s',
+               api_call_record.api_name, api_call_record.status_code, 1000 * api_call_record.duration,
+               api_call_record.retry_count, api_call_record.error_message or '-',
+               extra={'api_call': api_call_record})
+
+
+class BannerFormatter(logging.Formatter):
+    """Opt-in debug format, renders per-call records as the multi-line banner BitmexAPI used to print."""
+
+    def format(self, record):
+        api_call_record = getattr(record, 'api_call', None)
+        if api_call_record is None:
+            return super().format(record)
+
+        return '\n'.join([
+            '-------------------------------------API CALL BEGINNING----------------------------',
+            'API Name =  {}'.format(api_call_record.api_name),
+            'Response Code =  {}'.format(api_call_record.status_code),
+            'Api Executed at =  {}'.format(api_call_record.time_of_call),
+            'Duration =  {:.1f} ms'.format(1000 * api_call_record.duration),
+            'Retry Count =  {}'.format(api_call_record.retry_count),
+            'Error Message =  {}'.format(api_call_record.error_message),
+            '-------------------------------------API CALL END---------------------------------',
+        ])
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Hands records to a QueueListener without ever blocking the caller. Formatting is left to the listener
+    thread, and when the queue is full the record is dropped and counted instead of waiting.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped_count = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped_count += 1
+
+
+def start_queue_logging(*handlers, level=logging.INFO, max_queue_size=MAX_QUEUE_SIZE_DEFAULT):
+    """
+    Routes the BitmexAPI logger through a NonBlockingQueueHandler into `handlers`, which run on a listener thread.
+    Returns the started QueueListener, stop it to flush and detach.
+    """
+    log_queue = queue.Queue(maxsize=max_queue_size)
+    queue_handler = NonBlockingQueueHandler(log_queue)
+    LOGGER.addHandler(queue_handler)
+    LOGGER.setLevel(level)
+
+    listener = QueueLoggingListener(log_queue, queue_handler, *handlers)
+    listener.start()
+
+    return listener
+
+
+class QueueLoggingListener(logging.handlers.QueueListener):
+
+    def __init__(self, log_queue, queue_handler, *handlers):
+        super().__init__(log_queue, *handlers, respect_handler_level=True)
+        self.queue_handler = queue_handler
+
+    def stop(self):
+        LOGGER.removeHandler(self.queue_handler)
+        super().stop()
+
+
+def create_stream_handler(stream=None, with_banner_format=False):
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(BannerFormatter() if with_banner_format else logging.Formatter(STRUCTURED_FORMAT))
+
+    return handler
@@ -0,0 +1,144 @@
+import bisect
+import os
+import threading
+from collections import defaultdict
+
+# Log-linear (HDR-style) latency buckets: every doubling from MIN_LATENCY is split into SUB_BUCKET_COUNT linear steps
+MIN_LATENCY = 0.0001
+OCTAVE_COUNT = 21
+SUB_BUCKET_COUNT = 4
+
+BUCKET_UPPER_BOUNDS = [MIN_LATENCY] + [MIN_LATENCY * 2 ** octave * (1 + (sub_bucket + 1) / SUB_BUCKET_COUNT)
+                                       for octave in range(OCTAVE_COUNT) for sub_bucket in range(SUB_BUCKET_COUNT)]
+
+METRIC_PREFIX = 'bitmex_api'
+NO_STATUS = 'none'
+
+
+def get_status_label(status_code):
+    # Bravado responses print as e.g. '200 OK', only the numeric code is kept as a label
+    return status_code.split(' ', 1)[0] if status_code else NO_STATUS
+
+
+class LatencyHistogram:
+    """Fixed log-linear buckets, so recording is a bisect plus an increment and memory does not grow with calls."""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_UPPER_BOUNDS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def record(self, duration):
+        self.counts[bisect.bisect_left(BUCKET_UPPER_BOUNDS, duration)] += 1
+        self.count += 1
+        self.sum += duration
+        self.max = max(self.max, duration)
+
+    def percentile(self, p):
+        """Upper bound of the bucket holding the p-th percentile, capped at the largest recorded value."""
+        if self.count == 0:
+            return None
+
+        rank = p / 100 * self.count
+        cumulative_count = 0
+        for index, count in enumerate(self.counts):
+            cumulative_count += count
+            if count and cumulative_count >= rank:
+                upper_bound = BUCKET_UPPER_BOUNDS[index] if index < len(BUCKET_UPPER_BOUNDS) else self.max
+                return min(upper_bound, self.max)
+
+        return self.max
+
+
+class EndpointMetrics:
+
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.status_codes = defaultdict(int)
+        self.exceptions = defaultdict(int)
+        self.retries = 0
+
+
+class ApiMetrics:
+    """
+    In-process latency and error metrics keyed by BitmexAPI endpoint name (see real_world_example.ENDPOINTS),
+    which keeps label cardinality constant however many reference keys end up in the api_name strings.
+    Read them with `snapshot` or `write_prometheus_file`.
+    """
+
+    def __init__(self):
+        self.__endpoints = defaultdict(EndpointMetrics)
+        self.__lock = threading.Lock()
+
+    def record_attempt(self, endpoint_name, status_code, duration, exception=None):
+        with self.__lock:
+            endpoint_metrics = self.__endpoints[endpoint_name]
+            endpoint_metrics.latency.record(duration)
+            endpoint_metrics.status_codes[get_status_label(status_code)] += 1
+            if exception is not None:
+                endpoint_metrics.exceptions[type(exception).__name__] += 1
+
+    def record_retry(self, endpoint_name):
+        with self.__lock:
+            self.__endpoints[endpoint_name].retries += 1
+
+    def snapshot(self):
+        with self.__lock:
+            return {endpoint_name: {
+                'count': endpoint_metrics.latency.count,
+                'sum': endpoint_metrics.latency.sum,
+                'max': endpoint_metrics.latency.max,
+                'p50': endpoint_metrics.latency.percentile(50),
+                'p90': endpoint_metrics.latency.percentile(90),
+                'p99': endpoint_metrics.latency.percentile(99),
+                'status_codes': dict(endpoint_metrics.status_codes),
+                'exceptions': dict(endpoint_metrics.exceptions),
+                'retries': endpoint_metrics.retries,
+            } for endpoint_name, endpoint_metrics in self.__endpoints.items()}
+
+    def to_prometheus_text(self):
+        with self.__lock:
+            lines = [
+                '# HELP {}_request_duration_seconds Duration of a single API call attempt'.format(METRIC_PREFIX),
+                '# TYPE {}_request_duration_seconds histogram'.format(METRIC_PREFIX),
+            ]
+            for endpoint_name, endpoint_metrics in sorted(self.__endpoints.items()):
+                histogram = endpoint_metrics.latency
+                cumulative_count = 0
+                for upper_bound, count in zip(BUCKET_UPPER_BOUNDS, histogram.counts):
+                    cumulative_count += count
+                    lines.append('{}_request_duration_seconds_bucket{{endpoint="{}",le="{:.6g}"}} {}'.format(
+                        METRIC_PREFIX, endpoint_name, upper_bound, cumulative_count))
+                lines.append('{}_request_duration_seconds_bucket{{endpoint="{}",le="+Inf"}} {}'.format(
+                    METRIC_PREFIX, endpoint_name, histogram.count))
+                lines.append('{}_request_duration_seconds_sum{{endpoint="{}"}} {:.6f}'.format(
+                    METRIC_PREFIX, endpoint_name, histogram.sum))
+                lines.append('{}_request_duration_seconds_count{{endpoint="{}"}} {}'.format(
+                    METRIC_PREFIX, endpoint_name, histogram.count))
+
+            lines.append('# TYPE {}_responses_total counter'.format(METRIC_PREFIX))
+            for endpoint_name, endpoint_metrics in sorted(self.__endpoints.items()):
+                for status, count in sorted(endpoint_metrics.status_codes.items()):
+                    lines.append('{}_responses_total{{endpoint="{}",status="{}"}} {}'.format(
+                        METRIC_PREFIX, endpoint_name, status, count))
+
+            lines.append('# TYPE {}_exceptions_total counter'.format(METRIC_PREFIX))
+            for endpoint_name, endpoint_metrics in sorted(self.__endpoints.items()):
+                for exception_name, count in sorted(endpoint_metrics.exceptions.items()):
+                    lines.append('{}_exceptions_total{{endpoint="{}",exception="{}"}} {}'.format(
+                        METRIC_PREFIX, endpoint_name, exception_name, count))
+
+            lines.append('# TYPE {}_retries_total counter'.format(METRIC_PREFIX))
+            for endpoint_name, endpoint_metrics in sorted(self.__endpoints.items()):
+                lines.append('{}_retries_total{{endpoint="{}"}} {}'.format(
+                    METRIC_PREFIX, endpoint_name, endpoint_metrics.retries))
+
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus_file(self, file_path):
+        # Written next to the target and renamed, so a node exporter textfile collector never reads half a file
+        temporary_file_path = '{}.{}.tmp'.format(file_path, os.getpid())
+        with open(temporary_file_path, 'w') as prometheus_file:
+            prometheus_file.write(self.to_prometheus_text())
+        os.replace(temporary_file_path, file_path)
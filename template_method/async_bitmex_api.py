@@ -0,0 +1,115 @@
+import asyncio
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+from database.LogService import LogService
+from enums.ApiStage import ApiStage
+from enums.OrderStatus import OrderStatus
+from models.Order import Order
+from template_method.log_sinks import BatchedLogSink
+from template_method.real_world_example import BitmexAPI, BITCOIN_SYMBOL, BIN_SIZE_DEFAULT, COUNT_DEFAULT
+
+MAX_CONCURRENT_REQUESTS_DEFAULT = 8
+
+AccountSnapshot = namedtuple('AccountSnapshot', ['position', 'btc_balance', 'last_trades', 'open_orders'])
+
+
+class AsyncBitmexAPI:
+    """
+    Coroutine counterpart of BitmexAPI. Every call is delegated to the wrapped BitmexAPI on a thread pool,
+    so retries, rate limiting and api_name logging behave exactly like the synchronous version while
+    independent calls can be awaited concurrently.
+
+    Concurrent calls log concurrently, so the BitmexAPI needs a thread-safe log sink (e.g. BatchedLogSink, whose
+    single flusher thread does every DB write) unless `max_concurrent_requests` is 1.
+    """
+
+    def __init__(self, bitmex_api: BitmexAPI, max_concurrent_requests=MAX_CONCURRENT_REQUESTS_DEFAULT):
+        if max_concurrent_requests > 1 and not getattr(bitmex_api.log_sink, 'is_thread_safe', False):
+            raise ValueError('AsyncBitmexAPI with max_concurrent_requests = {} needs a thread-safe log sink, '
+                             'e.g. BatchedLogSink(LogService(session))'.format(max_concurrent_requests))
+
+        self.__bitmex_api = bitmex_api
+        self.__executor = ThreadPoolExecutor(max_workers=max_concurrent_requests,
+                                             thread_name_prefix='AsyncBitmexAPI')
+
+    @classmethod
+    def from_api_stage(cls, api_stage: ApiStage, caller, max_concurrent_requests=MAX_CONCURRENT_REQUESTS_DEFAULT,
+                       **bitmex_api_kwargs):
+        if bitmex_api_kwargs.get('log_sink') is None:
+            bitmex_api_kwargs['log_sink'] = BatchedLogSink(LogService(bitmex_api_kwargs.get('session')))
+        return cls(BitmexAPI(api_stage, caller, **bitmex_api_kwargs), max_concurrent_requests)
+
+    def close(self):
+        self.__executor.shutdown(wait=True)
+        self.__bitmex_api.log_sink.flush()
+
+    async def get_current_btc_price(self):
+        return await self.__run(self.__bitmex_api.get_current_btc_price)
+
+    async def get_bucketed_trades(self, symbol=BITCOIN_SYMBOL, bin_size=BIN_SIZE_DEFAULT, n=COUNT_DEFAULT,
+                                  reverse=True):
+        return await self.__run(self.__bitmex_api.get_bucketed_trades, symbol=symbol, bin_size=bin_size, n=n,
+                                reverse=reverse)
+
+    async def get_bucketed_trades_since_timestamp(self, timestamp, symbol=BITCOIN_SYMBOL, bin_size=BIN_SIZE_DEFAULT,
+                                                  max_result_count=COUNT_DEFAULT, end_time=None):
+        return await self.__run(self.__bitmex_api.get_bucketed_trades_since_timestamp, timestamp, symbol=symbol,
+                                bin_size=bin_size, max_result_count=max_result_count, end_time=end_time)
+
+    async def place_order(self, order: Order):
+        return await self.__run(self.__bitmex_api.place_order, order)
+
+    async def place_orders(self, orders: List[Order]):
+        return await self.__run(self.__bitmex_api.place_orders, orders)
+
+    async def add_stop_loss(self, order: Order):
+        return await self.__run(self.__bitmex_api.add_stop_loss, order)
+
+    async def cancel_order_by_ref_key(self, ref_key: str):
+        return await self.__run(self.__bitmex_api.cancel_order_by_ref_key, ref_key)
+
+    async def cancel_orders_by_ref_keys(self, ref_keys: List[str]):
+        return await self.__run(self.__bitmex_api.cancel_orders_by_ref_keys, ref_keys)
+
+    async def execute_order_on_market(self, order: Order):
+        return await self.__run(self.__bitmex_api.execute_order_on_market, order)
+
+    async def get_position(self):
+        return await self.__run(self.__bitmex_api.get_position)
+
+    async def get_last_n_trades(self, symbol, n):
+        return await self.__run(self.__bitmex_api.get_last_n_trades, symbol, n)
+
+    async def get_btc_balance(self):
+        return await self.__run(self.__bitmex_api.get_btc_balance)
+
+    async def get_order_executions_in_last_n_minutes(self, n=None):
+        return await self.__run(self.__bitmex_api.get_order_executions_in_last_n_minutes, n=n)
+
+    async def get_orders_of_given_status_in_last_n_minutes(self, order_status: OrderStatus = None, n=None):
+        return await self.__run(self.__bitmex_api.get_orders_of_given_status_in_last_n_minutes,
+                                order_status=order_status, n=n)
+
+    async def get_account_snapshot(self, symbol=BITCOIN_SYMBOL, n_trades=1) -> AccountSnapshot:
+        position, btc_balance, last_trades, open_orders = await asyncio.gather(
+            self.get_position(),
+            self.get_btc_balance(),
+            self.get_last_n_trades(symbol=symbol, n=n_trades),
+            self.get_orders_of_given_status_in_last_n_minutes(order_status=OrderStatus.PLACED))
+
+        return AccountSnapshot(position=position, btc_balance=btc_balance, last_trades=last_trades,
+                               open_orders=open_orders)
+
+    async def __run(self, method, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.__executor, lambda: method(*args, **kwargs))
+
+
+def get_account_snapshot_serially(bitmex_api: BitmexAPI, symbol=BITCOIN_SYMBOL, n_trades=1) -> AccountSnapshot:
+    return AccountSnapshot(position=bitmex_api.get_position(),
+                           btc_balance=bitmex_api.get_btc_balance(),
+                           last_trades=bitmex_api.get_last_n_trades(symbol=symbol, n=n_trades),
+                           open_orders=bitmex_api.get_orders_of_given_status_in_last_n_minutes(
+                               order_status=OrderStatus.PLACED))
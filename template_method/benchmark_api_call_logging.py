@@ -0,0 +1,74 @@
+import io
+import logging
+import subprocess
+import sys
+import time
+
+from enums.ApiStage import ApiStage
+from template_method.api_call_logging import LOGGER, create_stream_handler, start_queue_logging
+from template_method.fake_bitmex_client import FakeBitmexClient, get_default_handlers
+from template_method.log_sinks import SynchronousLogSink
+from template_method.rate_limiting import TokenBucket
+from template_method.real_world_example import BitmexAPI
+
+NUM_CALLS = 5000
+
+# Reads stdin line by line with a small delay, like a terminal or a log shipper that cannot keep up
+SLOW_READER_SCRIPT = 'import sys, time\nfor line in sys.stdin:\n    time.sleep(0.00002)\n'
+
+
+class NullLogService:
+
+    def log_api_call(self, **log_entry):
+        pass
+
+
+def create_bitmex_api():
+    return BitmexAPI(api_stage=list(ApiStage)[0],
+                     caller='benchmark',
+                     log_sink=SynchronousLogSink(NullLogService()),
+                     rate_limiter=TokenBucket(rate=1e6, capacity=1e6),
+                     bitmex_client=FakeBitmexClient(handlers=get_default_handlers()))
+
+
+def measure_calls_per_second(bitmex_api):
+    start = time.perf_counter()
+    for _ in range(NUM_CALLS):
+        bitmex_api.get_position()
+    return NUM_CALLS / (time.perf_counter() - start)
+
+
+def open_slow_pipe():
+    reader = subprocess.Popen([sys.executable, '-c', SLOW_READER_SCRIPT], stdin=subprocess.PIPE)
+    return reader, io.TextIOWrapper(reader.stdin, line_buffering=True)
+
+
+def run_with_handler(name, bitmex_api, with_banner_format, with_queue, level=logging.INFO):
+    reader, pipe = open_slow_pipe()
+    handler = create_stream_handler(pipe, with_banner_format=with_banner_format)
+
+    if with_queue:
+        listener = start_queue_logging(handler, level=level)
+    else:
+        LOGGER.addHandler(handler)
+        LOGGER.setLevel(level)
+
+    calls_per_second = measure_calls_per_second(bitmex_api)
+
+    if with_queue:
+        listener.stop()
+    else:
+        LOGGER.removeHandler(handler)
+    pipe.close()
+    reader.wait()
+
+    print('{:<36} = {:9.0f} calls/sec'.format(name, calls_per_second))
+
+
+# Example usage: python -m template_method.benchmark_api_call_logging
+bitmex_api = create_bitmex_api()
+
+run_with_handler('banner, synchronous (old behaviour)', bitmex_api, with_banner_format=True, with_queue=False)
+run_with_handler('structured, synchronous', bitmex_api, with_banner_format=False, with_queue=False)
+run_with_handler('structured, queue handler', bitmex_api, with_banner_format=False, with_queue=True)
+run_with_handler('level = WARNING', bitmex_api, with_banner_format=False, with_queue=True, level=logging.WARNING)
@@ -0,0 +1,54 @@
+import tempfile
+import time
+
+from enums.ApiStage import ApiStage
+from template_method.api_metrics import ApiMetrics
+from template_method.fake_bitmex_client import FakeBitmexClient, get_default_handlers
+from template_method.log_sinks import SynchronousLogSink
+from template_method.rate_limiting import TokenBucket, RetryPolicy
+from template_method.real_world_example import BitmexAPI
+
+NUM_CALLS = 20000
+
+
+class NullLogService:
+
+    def log_api_call(self, **log_entry):
+        pass
+
+
+def create_bitmex_api(metrics=None, bitmex_client=None):
+    return BitmexAPI(api_stage=list(ApiStage)[0],
+                     caller='benchmark',
+                     log_sink=SynchronousLogSink(NullLogService()),
+                     rate_limiter=TokenBucket(rate=1e6, capacity=1e6),
+                     retry_policy=RetryPolicy(base_delay=0.0),
+                     bitmex_client=bitmex_client or FakeBitmexClient(handlers=get_default_handlers()),
+                     metrics=metrics)
+
+
+def measure_microseconds_per_call(bitmex_api):
+    start = time.perf_counter()
+    for _ in range(NUM_CALLS):
+        bitmex_api.get_position()
+    return 1e6 * (time.perf_counter() - start) / NUM_CALLS
+
+
+# Example usage: python -m template_method.benchmark_api_metrics
+print('metrics disabled = {:6.2f} us per call'.format(measure_microseconds_per_call(create_bitmex_api())))
+print('metrics enabled  = {:6.2f} us per call'.format(measure_microseconds_per_call(create_bitmex_api(ApiMetrics()))))
+
+metrics = ApiMetrics()
+flaky_client = FakeBitmexClient(handlers=get_default_handlers(), latency=0.002,
+                                scripted_statuses={'Order.Order_cancel': [429, 503]})
+bitmex_api = create_bitmex_api(metrics, flaky_client)
+for _ in range(50):
+    bitmex_api.get_position()
+bitmex_api.cancel_order_by_ref_key('ref-key')
+
+for endpoint_name, endpoint_snapshot in metrics.snapshot().items():
+    print(endpoint_name, endpoint_snapshot)
+
+with tempfile.NamedTemporaryFile(suffix='.prom') as prometheus_file:
+    metrics.write_prometheus_file(prometheus_file.name)
+    print('Prometheus dump = {} lines'.format(len(open(prometheus_file.name).readlines())))
@@ -0,0 +1,56 @@
+import asyncio
+import contextlib
+import io
+import time
+
+from enums.ApiStage import ApiStage
+from template_method.async_bitmex_api import AsyncBitmexAPI, get_account_snapshot_serially
+from template_method.fake_bitmex_client import FakeBitmexClient, get_default_handlers
+from template_method.log_sinks import SynchronousLogSink
+from template_method.rate_limiting import TokenBucket
+from template_method.real_world_example import BitmexAPI
+
+NUM_TICKS = 20
+REQUEST_LATENCY = 0.05
+
+
+class NullLogService:
+
+    def log_api_call(self, **log_entry):
+        pass
+
+
+def create_bitmex_api():
+    return BitmexAPI(api_stage=list(ApiStage)[0],
+                     caller='benchmark',
+                     log_sink=SynchronousLogSink(NullLogService(), is_thread_safe=True),
+                     rate_limiter=TokenBucket(rate=1e6, capacity=1e6),
+                     bitmex_client=FakeBitmexClient(handlers=get_default_handlers(), latency=REQUEST_LATENCY))
+
+
+def measure_serial_ticks(bitmex_api):
+    start = time.perf_counter()
+    for _ in range(NUM_TICKS):
+        get_account_snapshot_serially(bitmex_api)
+    return (time.perf_counter() - start) / NUM_TICKS
+
+
+async def measure_concurrent_ticks(async_bitmex_api):
+    start = time.perf_counter()
+    for _ in range(NUM_TICKS):
+        await async_bitmex_api.get_account_snapshot()
+    return (time.perf_counter() - start) / NUM_TICKS
+
+
+# Example usage: python -m template_method.benchmark_async_bitmex_api
+bitmex_api = create_bitmex_api()
+async_bitmex_api = AsyncBitmexAPI(bitmex_api)
+
+with contextlib.redirect_stdout(io.StringIO()):
+    serial_tick = measure_serial_ticks(bitmex_api)
+    concurrent_tick = asyncio.run(measure_concurrent_ticks(async_bitmex_api))
+
+async_bitmex_api.close()
+
+print('Serial snapshot tick     = {:7.1f} ms'.format(1000 * serial_tick))
+print('Concurrent snapshot tick = {:7.1f} ms'.format(1000 * concurrent_tick))
@@ -0,0 +1,209 @@
+import io
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+from bravado.exception import HTTPError
+
+from enums.ApiStage import ApiStage
+from enums.OrderSide import OrderSide
+from enums.OrderStatus import OrderStatus
+from models.Order import Order
+from template_method.api_call_logging import LOGGER, create_stream_handler, start_queue_logging
+from template_method.api_metrics import ApiMetrics, LatencyHistogram
+from template_method.fake_bitmex_client import FakeBitmexClient, get_default_handlers
+from template_method.log_sinks import SynchronousLogSink
+from template_method.rate_limiting import TokenBucket, RetryPolicy
+from template_method.real_world_example import BitmexAPI
+from template_method.record_replay import ExchangeRecorder, RecordingBitmexClient, ReplayBitmexClient, load_recording
+
+TARGET_QPS = 200
+LOAD_DURATION = 5.0
+NUM_WORKERS = 8
+REPLAY_LATENCY = 0.005
+NUM_OVERHEAD_CALLS = 5000
+
+
+class NullLogService:
+
+    def log_api_call(self, **log_entry):
+        pass
+
+
+def create_order(index, order_side=OrderSide.BUY):
+    return Order(reference_key='ref-key-{}'.format(index), order_side=order_side, size=100, price=10000.0 + index)
+
+
+# One call per BitmexAPI endpoint, see real_world_example.ENDPOINTS
+ENDPOINT_CALLS = [
+    ('GET_BUCKETED_TRADES', lambda bitmex_api, index: bitmex_api.get_bucketed_trades(n=100)),
+    ('GET_BUCKETED_TRADES_SINCE_TIMESTAMP', lambda bitmex_api, index: bitmex_api.get_bucketed_trades_since_timestamp(
+        datetime(2020, 1, 1, tzinfo=timezone.utc) + timedelta(minutes=index % 60), max_result_count=100)),
+    ('GET_POSITION', lambda bitmex_api, index: bitmex_api.get_position()),
+    ('GET_LAST_TRADES', lambda bitmex_api, index: bitmex_api.get_last_n_trades(symbol='XBTUSD', n=10)),
+    ('GET_BTC_BALANCE', lambda bitmex_api, index: bitmex_api.get_btc_balance()),
+    ('GET_ORDER_EXECUTIONS', lambda bitmex_api, index: bitmex_api.get_order_executions_in_last_n_minutes(n=60)),
+    ('GET_ORDERS', lambda bitmex_api, index: bitmex_api.get_orders_of_given_status_in_last_n_minutes(
+        OrderStatus.PLACED, n=60)),
+    ('PLACE_ORDER', lambda bitmex_api, index: bitmex_api.place_order(create_order(index))),
+    ('ADD_STOP_LOSS', lambda bitmex_api, index: bitmex_api.add_stop_loss(create_order(index, OrderSide.SELL))),
+    ('CANCEL_ORDER', lambda bitmex_api, index: bitmex_api.cancel_order_by_ref_key('ref-key-{}'.format(index))),
+    ('EXECUTE_ORDER', lambda bitmex_api, index: bitmex_api.execute_order_on_market(create_order(index))),
+    ('PLACE_ORDERS', lambda bitmex_api, index: bitmex_api.place_orders(
+        [create_order(10 * index + offset) for offset in range(10)])),
+    ('CANCEL_ORDERS', lambda bitmex_api, index: bitmex_api.cancel_orders_by_ref_keys(
+        ['ref-key-{}'.format(10 * index + offset) for offset in range(10)])),
+]
+
+
+def create_bitmex_api(bitmex_client, metrics=None, with_verbose_logging=False):
+    return BitmexAPI(api_stage=list(ApiStage)[0],
+                     caller='benchmark',
+                     with_verbose_logging=with_verbose_logging,
+                     log_sink=SynchronousLogSink(NullLogService(), is_thread_safe=True),
+                     rate_limiter=TokenBucket(rate=1e6, capacity=1e6),
+                     retry_policy=RetryPolicy(base_delay=0.01, max_delay=0.1),
+                     bitmex_client=bitmex_client,
+                     metrics=metrics)
+
+
+def record_synthetic_session(file_path):
+    """Stands in for a live session, record one with `RecordingBitmexClient(get_bitmex_api_client(stage), recorder)`."""
+    with ExchangeRecorder(file_path) as recorder:
+        bitmex_api = create_bitmex_api(RecordingBitmexClient(FakeBitmexClient(handlers=get_default_handlers(),
+                                                                              latency=REPLAY_LATENCY), recorder))
+        for index in range(10):
+            for _, call in ENDPOINT_CALLS:
+                call(bitmex_api, index)
+
+        return recorder.recorded_count
+
+
+def run_at_target_qps(bitmex_api, target_qps, duration, num_workers):
+    """
+    Open-loop load: call i is due at start + i / target_qps, round robin over ENDPOINT_CALLS. Latency is measured
+    from the due time, so calls queued behind slow ones are not hidden (no coordinated omission).
+    """
+    num_calls = int(target_qps * duration)
+    histograms = defaultdict(LatencyHistogram)
+    error_counts = defaultdict(int)
+    lock = threading.Lock()
+    next_index = iter(range(num_calls))
+    start = time.perf_counter()
+
+    def run_worker():
+        while True:
+            with lock:
+                index = next(next_index, None)
+            if index is None:
+                return
+
+            due_time = start + index / target_qps
+            delay = due_time - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+            endpoint_name, call = ENDPOINT_CALLS[index % len(ENDPOINT_CALLS)]
+            error = None
+            try:
+                call(bitmex_api, index)
+            except HTTPError as e:
+                error = type(e).__name__
+            latency = time.perf_counter() - due_time
+
+            with lock:
+                histograms[endpoint_name].record(latency)
+                if error is not None:
+                    error_counts[error] += 1
+
+    workers = [threading.Thread(target=run_worker) for _ in range(num_workers)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    return num_calls / (time.perf_counter() - start), histograms, error_counts
+
+
+def print_load_report(name, bitmex_api, target_qps, metrics=None):
+    throughput, histograms, error_counts = run_at_target_qps(bitmex_api, target_qps, LOAD_DURATION, NUM_WORKERS)
+
+    print('{}: target {} calls/sec, achieved {:.1f} calls/sec, errors {}'.format(name, target_qps, throughput,
+                                                                               dict(error_counts)))
+    print('  {:<36} {:>6} {:>9} {:>9} {:>9}'.format('endpoint', 'calls', 'p50 ms', 'p90 ms', 'p99 ms'))
+    for endpoint_name, _ in ENDPOINT_CALLS:
+        histogram = histograms[endpoint_name]
+        print('  {:<36} {:>6} {:>9.2f} {:>9.2f} {:>9.2f}'.format(
+            endpoint_name, histogram.count, 1e3 * histogram.percentile(50), 1e3 * histogram.percentile(90),
+            1e3 * histogram.percentile(99)))
+
+    if metrics is not None:
+        retries = sum(endpoint_snapshot['retries'] for endpoint_snapshot in metrics.snapshot().values())
+        print('  retries = {}'.format(retries))
+
+
+def measure_microseconds_per_call(bitmex_api):
+    start = time.perf_counter()
+    for index in range(NUM_OVERHEAD_CALLS):
+        ENDPOINT_CALLS[index % len(ENDPOINT_CALLS)][1](bitmex_api, index)
+    return 1e6 * (time.perf_counter() - start) / NUM_OVERHEAD_CALLS
+
+
+def print_logging_overhead(exchanges):
+    # No replay latency, so whatever is left is BitmexAPI's own per-call cost
+    baseline_api = create_bitmex_api(ReplayBitmexClient(exchanges, latency=0.0))
+    verbose_api = create_bitmex_api(ReplayBitmexClient(exchanges, latency=0.0), with_verbose_logging=True)
+
+    LOGGER.setLevel(logging.WARNING)
+    baseline = measure_microseconds_per_call(baseline_api)
+    print('{:<38} = {:7.2f} us per call'.format('logging below WARNING disabled', baseline))
+
+    handler = create_stream_handler(io.StringIO())
+    LOGGER.addHandler(handler)
+    LOGGER.setLevel(logging.INFO)
+    synchronous = measure_microseconds_per_call(baseline_api)
+    LOGGER.removeHandler(handler)
+    print('{:<38} = {:7.2f} us per call (+{:.2f})'.format('INFO, synchronous handler', synchronous,
+                                                         synchronous - baseline))
+
+    for name, bitmex_api, level in [('INFO, queue handler', baseline_api, logging.INFO),
+                                    ('DEBUG + verbose bodies, queue handler', verbose_api, logging.DEBUG)]:
+        listener = start_queue_logging(create_stream_handler(io.StringIO()), level=level)
+        microseconds_per_call = measure_microseconds_per_call(bitmex_api)
+        listener.stop()
+        print('{:<38} = {:7.2f} us per call (+{:.2f})'.format(name, microseconds_per_call,
+                                                             microseconds_per_call - baseline))
+
+    LOGGER.setLevel(logging.WARNING)
+
+
+# Example usage: python -m template_method.benchmark_bitmex_api_load [recording.msgpack.gz]
+if len(sys.argv) > 1:
+    exchanges = load_recording(sys.argv[1])
+else:
+    with tempfile.TemporaryDirectory() as directory:
+        recording_file_path = os.path.join(directory, 'session.msgpack.gz')
+        recorded_count = record_synthetic_session(recording_file_path)
+        print('Recorded {} exchanges into {} bytes'.format(recorded_count, os.path.getsize(recording_file_path)))
+        exchanges = load_recording(recording_file_path)
+
+# Injected 429/503 retries log warnings, keep them off stderr
+LOGGER.addHandler(logging.NullHandler())
+LOGGER.setLevel(logging.WARNING)
+print_load_report('replay, {:.0f} ms latency'.format(1e3 * REPLAY_LATENCY),
+                  create_bitmex_api(ReplayBitmexClient(exchanges, latency=REPLAY_LATENCY)), TARGET_QPS)
+
+metrics = ApiMetrics()
+flaky_client = ReplayBitmexClient(exchanges, latency=REPLAY_LATENCY, error_rates={429: 0.02, 503: 0.01},
+                                  retry_after=0.01, seed=0)
+print_load_report('replay, 2% 429 + 1% 503 injected', create_bitmex_api(flaky_client, metrics), TARGET_QPS,
+                  metrics)
+print('  injected = {}, unmatched requests = {} of {}'.format(dict(flaky_client.injected_error_counts),
+                                                            flaky_client.miss_count, flaky_client.call_count))
+
+print_logging_overhead(exchanges)
@@ -0,0 +1,123 @@
+import json
+import time
+
+from enums.ApiStage import ApiStage
+from enums.OrderSide import OrderSide
+from models.Order import Order
+from template_method.fake_bitmex_client import FakeBitmexClient, get_default_handlers
+from template_method.log_sinks import SynchronousLogSink
+from template_method.rate_limiting import TokenBucket, RetryPolicy
+from template_method.real_world_example import BitmexAPI
+
+NUM_ORDERS = 23
+NUM_TIMED_ORDERS = 100
+FAKE_LATENCY = 0.005
+
+
+class CountingLogService:
+
+    def __init__(self):
+        self.log_entries = []
+
+    def log_api_call(self, **log_entry):
+        self.log_entries.append(log_entry)
+
+
+def create_bitmex_api(bitmex_client, log_service=None):
+    return BitmexAPI(api_stage=list(ApiStage)[0],
+                     caller='benchmark',
+                     log_sink=SynchronousLogSink(log_service or CountingLogService()),
+                     rate_limiter=TokenBucket(rate=1e6, capacity=1e6),
+                     retry_policy=RetryPolicy(base_delay=0.0),
+                     bitmex_client=bitmex_client)
+
+
+def create_orders(num_orders):
+    return [Order(reference_key='ref-key-{}'.format(index), order_side=OrderSide.BUY, size=100,
+                  price=10000.0 + index) for index in range(num_orders)]
+
+
+def get_reference_keys(num_orders):
+    return ['ref-key-{}'.format(index) for index in range(num_orders)]
+
+
+def check_chunking():
+    bitmex_client = FakeBitmexClient(handlers=get_default_handlers())
+    log_service = CountingLogService()
+    bitmex_api = create_bitmex_api(bitmex_client, log_service)
+
+    results = bitmex_api.place_orders(create_orders(NUM_ORDERS))
+    assert bitmex_client.count_calls('Order.Order_newBulk') == 3
+    assert [len(json.loads(params['orders'])) for key, params in bitmex_client.calls] == [10, 10, 3]
+    assert [result.reference_key for result in results] == get_reference_keys(NUM_ORDERS)
+    assert all(result.error is None for result in results)
+    assert len(log_service.log_entries) == 3
+
+    results = bitmex_api.cancel_orders_by_ref_keys(get_reference_keys(NUM_ORDERS))
+    assert bitmex_client.count_calls('Order.Order_cancel') == 3
+    assert [result.reference_key for result in results] == get_reference_keys(NUM_ORDERS)
+    assert all(result.response['ordStatus'] == 'Canceled' for result in results)
+
+
+def check_failed_chunk():
+    # 400 is not retried, so the second chunk fails while the first and third go through
+    bitmex_client = FakeBitmexClient(handlers=get_default_handlers(),
+                                     scripted_statuses={'Order.Order_newBulk': [200, 400],
+                                                        'Order.Order_cancel': [400]})
+    bitmex_api = create_bitmex_api(bitmex_client)
+
+    results = bitmex_api.place_orders(create_orders(NUM_ORDERS))
+    assert [result.reference_key for result in results] == get_reference_keys(NUM_ORDERS)
+    assert all(result.error is None and result.response is not None for result in results[:10] + results[20:])
+    assert all(result.error is not None and result.response is None for result in results[10:20])
+
+    results = bitmex_api.cancel_orders_by_ref_keys(get_reference_keys(NUM_ORDERS))
+    assert all(result.error is not None for result in results[:10])
+    assert all(result.error is None for result in results[10:])
+
+
+def check_rejected_and_missing_orders():
+    default_new_orders = get_default_handlers()['Order.Order_newBulk']
+
+    def new_orders(**params):
+        # Out of order, one rejected, one failed, one missing
+        orders = list(reversed(default_new_orders(**params)))
+        for order in orders:
+            if order['clOrdID'] == 'ref-key-3':
+                order['ordStatus'] = 'Rejected'
+                order['ordRejReason'] = 'Insufficient margin'
+            elif order['clOrdID'] == 'ref-key-5':
+                order['error'] = 'Invalid price'
+        return [order for order in orders if order['clOrdID'] != 'ref-key-7']
+
+    bitmex_client = FakeBitmexClient(handlers={'Order.Order_newBulk': new_orders})
+    results = {result.reference_key: result for result in
+               create_bitmex_api(bitmex_client).place_orders(create_orders(10))}
+
+    assert results['ref-key-3'].error == 'Insufficient margin'
+    assert results['ref-key-3'].response['clOrdID'] == 'ref-key-3'
+    assert results['ref-key-5'].error == 'Invalid price'
+    assert results['ref-key-7'].error is not None and results['ref-key-7'].response is None
+    assert all(results[reference_key].error is None and results[reference_key].response['clOrdID'] == reference_key
+               for reference_key in get_reference_keys(10) if reference_key not in ('ref-key-3', 'ref-key-5',
+                                                                                      'ref-key-7'))
+
+
+def measure_seconds(place):
+    start = time.perf_counter()
+    place()
+    return time.perf_counter() - start
+
+
+# Example usage: python -m template_method.benchmark_bulk_orders
+check_chunking()
+check_failed_chunk()
+check_rejected_and_missing_orders()
+print('Chunking, failed chunks and rejected/missing orders OK')
+
+bitmex_api = create_bitmex_api(FakeBitmexClient(handlers=get_default_handlers(), latency=FAKE_LATENCY))
+orders = create_orders(NUM_TIMED_ORDERS)
+one_by_one = measure_seconds(lambda: [bitmex_api.place_order(order) for order in orders])
+bulk = measure_seconds(lambda: bitmex_api.place_orders(orders))
+print('{} orders one by one = {:7.1f} ms'.format(NUM_TIMED_ORDERS, 1e3 * one_by_one))
+print('{} orders in bulk    = {:7.1f} ms'.format(NUM_TIMED_ORDERS, 1e3 * bulk))
@@ -0,0 +1,61 @@
+import os
+import pickle
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone, timedelta
+
+from template_method.candle_frame import CandleFrame
+from template_method.fake_bitmex_client import get_synthetic_bucket
+
+# Roughly two years of 1m candles
+NUM_CANDLES = 1000000
+FIRST_TIMESTAMP = datetime(2019, 1, 1, tzinfo=timezone.utc)
+
+
+def create_buckets():
+    return [get_synthetic_bucket('XBTUSD', FIRST_TIMESTAMP + timedelta(minutes=index), 10000.0 + index % 1000)
+            for index in range(NUM_CANDLES)]
+
+
+def measure_memory(create):
+    tracemalloc.start()
+    result = create()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current
+
+
+def measure_time(action):
+    start = time.perf_counter()
+    result = action()
+    return result, time.perf_counter() - start
+
+
+def load_pickle(path):
+    with open(path, 'rb') as pickle_file:
+        return pickle.load(pickle_file)
+
+
+# Example usage: python -m template_method.benchmark_candle_frame
+buckets, buckets_memory = measure_memory(create_buckets)
+candle_frame, frame_memory = measure_memory(lambda: CandleFrame.from_buckets(buckets))
+
+with tempfile.TemporaryDirectory() as directory:
+    pickle_path = os.path.join(directory, 'candles.pickle')
+    frame_path = os.path.join(directory, 'candles')
+
+    with open(pickle_path, 'wb') as outfile:
+        pickle.dump(buckets, outfile, protocol=pickle.HIGHEST_PROTOCOL)
+    candle_frame.save(frame_path)
+
+    _, pickle_load_time = measure_time(lambda: load_pickle(pickle_path))
+    loaded_frame, frame_load_time = measure_time(lambda: CandleFrame.load(frame_path))
+    _, mean_close_time = measure_time(lambda: float(loaded_frame.close.mean()))
+
+print('Candles                          = {}'.format(NUM_CANDLES))
+print('list of dicts memory             = {:8.1f} MB'.format(buckets_memory / 1e6))
+print('CandleFrame memory               = {:8.1f} MB'.format(frame_memory / 1e6))
+print('list of dicts load (pickle)      = {:8.1f} ms'.format(1000 * pickle_load_time))
+print('CandleFrame load (memory-mapped) = {:8.1f} ms'.format(1000 * frame_load_time))
+print('mean close on mapped frame       = {:8.1f} ms'.format(1000 * mean_close_time))
@@ -0,0 +1,60 @@
+import tempfile
+import time
+
+from enums.ApiStage import ApiStage
+from template_method.client_registry import BitmexClientRegistry, CachedSpecClientFactory
+from template_method.log_sinks import SynchronousLogSink
+from template_method.real_world_example import BitmexAPI
+
+# Needs network access, only public endpoints are called so no credentials are required
+SPEC_URL = 'https://testnet.bitmex.com/api/explainer/swagger.json'
+NUM_INSTANCES = 5
+
+
+class NullLogService:
+
+    def log_api_call(self, **log_entry):
+        pass
+
+
+def measure_instance(client_registry):
+    start = time.perf_counter()
+    bitmex_api = BitmexAPI(api_stage=API_STAGE, caller='benchmark', log_sink=SynchronousLogSink(NullLogService()),
+                           client_registry=client_registry)
+    construction_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    bitmex_api.get_last_n_trades(symbol='XBTUSD', n=1)
+    first_call_time = time.perf_counter() - start
+
+    return construction_time, first_call_time
+
+
+def run_benchmark(name, create_client_registry):
+    timings = [measure_instance(create_client_registry()) for _ in range(NUM_INSTANCES)]
+    construction_time = sum(timing[0] for timing in timings) / NUM_INSTANCES
+    first_call_time = sum(timing[1] for timing in timings) / NUM_INSTANCES
+
+    print('{:<32} construction = {:8.1f} ms   first call = {:7.1f} ms'.format(
+        name, 1000 * construction_time, 1000 * first_call_time))
+
+
+# Example usage: python -m template_method.benchmark_client_registry
+API_STAGE = list(ApiStage)[0]
+
+with tempfile.TemporaryDirectory() as spec_cache_dir:
+    def create_cold_registry():
+        # A fresh, empty spec directory every time, i.e. download + parse + new session per instance
+        return BitmexClientRegistry(CachedSpecClientFactory({API_STAGE: SPEC_URL}, tempfile.mkdtemp()))
+
+    def create_cached_spec_registry():
+        return BitmexClientRegistry(CachedSpecClientFactory({API_STAGE: SPEC_URL}, spec_cache_dir))
+
+    warm_registry = create_cached_spec_registry()
+
+    # Fills spec_cache_dir
+    create_cached_spec_registry().get_client(API_STAGE)
+
+    run_benchmark('cold (spec download per instance)', create_cold_registry)
+    run_benchmark('cold (spec from local file)', create_cached_spec_registry)
+    run_benchmark('warm (shared registry)', lambda: warm_registry)
@@ -0,0 +1,83 @@
+import time
+from datetime import datetime
+
+from template_method.log_sinks import SynchronousLogSink, BatchedLogSink
+
+NUM_CALLS = 500
+API_CALL_DURATION = 0.001
+LOG_ROW_DURATION = 0.005
+LOG_BATCH_OVERHEAD = 0.005
+
+
+class SlowLogService:
+    # Mimics a DB round trip per insert, bulk inserts pay one round trip for the whole batch
+    def __init__(self):
+        self.rows = []
+
+    def log_api_call(self, **log_entry):
+        time.sleep(LOG_ROW_DURATION)
+        self.rows.append(log_entry)
+
+    def log_api_calls(self, log_entries):
+        time.sleep(LOG_BATCH_OVERHEAD)
+        self.rows.extend(log_entries)
+
+
+class RowByRowLogService:
+    # Like database.LogService, which has no bulk insert, so BatchedLogSink falls back to one insert per row
+    def __init__(self):
+        self.rows = []
+
+    def log_api_call(self, **log_entry):
+        time.sleep(LOG_ROW_DURATION)
+        self.rows.append(log_entry)
+
+
+def percentile(sorted_values, p):
+    index = min(len(sorted_values) - 1, int(round(p / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def measure_call_latencies(log_sink):
+    latencies = []
+    for i in range(NUM_CALLS):
+        start = time.perf_counter()
+
+        time.sleep(API_CALL_DURATION)
+        log_sink.log_api_call(vendor='BitmexBenchmark',
+                              api_name='GET_POSITION',
+                              status_code='200 OK',
+                              error_message='',
+                              response_body='{}',
+                              time_of_call=datetime.now(),
+                              caller='benchmark')
+
+        latencies.append(time.perf_counter() - start)
+
+    return sorted(latencies)
+
+
+def run_benchmark(name, log_service, log_sink):
+    latencies = measure_call_latencies(log_sink)
+    start = time.perf_counter()
+    log_sink.close()
+    drain_duration = time.perf_counter() - start
+
+    assert len(log_service.rows) == NUM_CALLS
+    print('{:<20} p50 = {:7.3f} ms   p99 = {:7.3f} ms   drain on close = {:7.1f} ms   rows logged = {}'.format(
+        name, 1000 * percentile(latencies, 50), 1000 * percentile(latencies, 99), 1000 * drain_duration,
+        len(log_service.rows)))
+
+
+# Example usage: python -m template_method.benchmark_log_sinks
+synchronous_log_service = SlowLogService()
+run_benchmark('synchronous', synchronous_log_service, SynchronousLogSink(synchronous_log_service))
+
+batched_log_service = SlowLogService()
+run_benchmark('batched, bulk insert', batched_log_service,
+              BatchedLogSink(batched_log_service, batch_size=50, flush_interval=0.1))
+
+# What production gets until database.LogService has a bulk insert
+row_by_row_log_service = RowByRowLogService()
+run_benchmark('batched, per row', row_by_row_log_service,
+              BatchedLogSink(row_by_row_log_service, batch_size=50, flush_interval=0.1))
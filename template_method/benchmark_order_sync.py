@@ -0,0 +1,122 @@
+import random
+import time
+from datetime import datetime, timedelta
+
+from enums.ApiStage import ApiStage
+from enums.OrderStatus import OrderStatus
+from template_method.fake_bitmex_client import FakeBitmexClient, FakeOrderStream
+from template_method.log_sinks import SynchronousLogSink
+from template_method.order_sync import OrderExecutionBook
+from template_method.rate_limiting import TokenBucket
+from template_method.real_world_example import BitmexAPI, GET_ORDERS_COUNT
+from utils.TimeUtils import get_past_utc_date
+
+NUM_INITIAL_ORDERS = 300
+NUM_POLLS = 100
+EVENTS_PER_POLL = 5
+WINDOW_MINUTES = 60
+NUM_RETENTION_POLLS = 600
+
+
+class NullLogService:
+
+    def log_api_call(self, **log_entry):
+        pass
+
+
+def create_bitmex_api(order_stream):
+    return BitmexAPI(api_stage=list(ApiStage)[0],
+                     caller='benchmark',
+                     log_sink=SynchronousLogSink(NullLogService()),
+                     rate_limiter=TokenBucket(rate=1e6, capacity=1e6),
+                     bitmex_client=FakeBitmexClient(handlers=order_stream.handlers()))
+
+
+def evolve(order_stream, random_generator, num_events):
+    for _ in range(num_events):
+        open_ref_keys = order_stream.get_open_ref_keys()
+        action = random_generator.choice(['place', 'fill', 'cancel']) if open_ref_keys else 'place'
+        if action == 'place':
+            order_stream.place('ref-key-{}'.format(random_generator.getrandbits(64)))
+        elif action == 'fill':
+            order_stream.fill(random_generator.choice(open_ref_keys))
+        else:
+            order_stream.cancel(random_generator.choice(open_ref_keys))
+
+
+def run_polls(name, poll):
+    order_stream = FakeOrderStream(now=lambda: get_past_utc_date(0))
+    random_generator = random.Random(42)
+    evolve(order_stream, random_generator, NUM_INITIAL_ORDERS)
+    poll_once = poll(create_bitmex_api(order_stream))
+
+    start = time.perf_counter()
+    for _ in range(NUM_POLLS):
+        evolve(order_stream, random_generator, EVENTS_PER_POLL)
+        open_orders = poll_once()
+    duration = time.perf_counter() - start
+
+    expected_open_ref_keys = set(order_stream.get_open_ref_keys())
+    assert {order['clOrdID'] for order in open_orders} == expected_open_ref_keys
+
+    print('{:<20} rows fetched = {:7}   {:6.2f} ms per poll'.format(
+        name, order_stream.served_row_count, 1000 * duration / NUM_POLLS))
+
+
+def full_window_poll(bitmex_api):
+    def poll_once():
+        bitmex_api.get_order_executions_in_last_n_minutes(n=WINDOW_MINUTES)
+        bitmex_api.get_orders_of_given_status_in_last_n_minutes(order_status=OrderStatus.EXECUTED, n=WINDOW_MINUTES)
+        return bitmex_api.get_orders_of_given_status_in_last_n_minutes(order_status=OrderStatus.PLACED,
+                                                                       n=WINDOW_MINUTES)
+
+    return poll_once
+
+
+def incremental_poll(bitmex_api):
+    order_execution_book = OrderExecutionBook(bitmex_api, initial_lookback_minutes=WINDOW_MINUTES)
+
+    def poll_once():
+        order_execution_book.get_order_executions_in_last_n_minutes(n=WINDOW_MINUTES)
+        order_execution_book.get_orders_of_given_status_in_last_n_minutes(order_status=OrderStatus.EXECUTED,
+                                                                          n=WINDOW_MINUTES)
+        return order_execution_book.get_orders_of_given_status_in_last_n_minutes(order_status=OrderStatus.PLACED,
+                                                                                  n=WINDOW_MINUTES)
+
+    return poll_once
+
+
+def check_retention():
+    """Polls once a simulated minute for 10 hours, the book must only hold open orders and the last hour."""
+    clock = [datetime(2020, 1, 1)]
+    order_stream = FakeOrderStream(now=lambda: clock[0])
+    random_generator = random.Random(42)
+    order_execution_book = OrderExecutionBook(create_bitmex_api(order_stream), retention_minutes=WINDOW_MINUTES,
+                                              get_past_date=lambda seconds: clock[0] - timedelta(seconds=seconds))
+
+    max_book_size = 0
+    for _ in range(NUM_RETENTION_POLLS):
+        clock[0] += timedelta(minutes=1)
+        evolve(order_stream, random_generator, EVENTS_PER_POLL)
+        order_execution_book.sync()
+        max_book_size = max(max_book_size, len(order_execution_book))
+
+    cutoff = clock[0] - timedelta(minutes=WINDOW_MINUTES)
+    open_ref_keys = set(order_stream.get_open_ref_keys())
+    recent_orders = [order for order in order_stream.get_orders()
+                     if order['timestamp'] >= cutoff or order['clOrdID'] in open_ref_keys]
+    assert {order['clOrdID'] for order in order_execution_book.get_orders_of_status(OrderStatus.PLACED)} \
+        == open_ref_keys
+    assert {order['orderID'] for order in order_execution_book.get_orders_of_status()} \
+        == {order['orderID'] for order in recent_orders}
+    assert len(order_execution_book.get_orders_of_given_status_in_last_n_minutes()) \
+        == min(len(recent_orders), GET_ORDERS_COUNT)
+
+    print('{:<20} rows held = {:7}   max {} while placing {} orders'.format(
+        'retention', len(order_execution_book), max_book_size, len(order_stream.get_orders())))
+
+
+# Example usage: python -m template_method.benchmark_order_sync
+run_polls('full window refetch', full_window_poll)
+run_polls('incremental sync', incremental_poll)
+check_retention()
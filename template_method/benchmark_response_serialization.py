@@ -0,0 +1,56 @@
+import timeit
+from datetime import datetime, timezone
+
+from enums.ApiStage import ApiStage
+from models.ApiCallLog import LOG_MESSAGE_LENGTH
+from template_method.fake_bitmex_client import FakeBitmexClient
+from template_method.log_sinks import SynchronousLogSink
+from template_method.rate_limiting import TokenBucket
+from template_method.real_world_example import BitmexAPI, ITER_TO_JSON
+from utils.json_utils import to_json
+
+NUM_ORDERS = 500
+NUM_REPETITIONS = 200
+
+
+class LastEntryLogService:
+
+    def __init__(self):
+        self.last_log_entry = None
+
+    def log_api_call(self, **log_entry):
+        self.last_log_entry = log_entry
+
+
+def create_orders_response():
+    return [{'orderID': 'order-{}'.format(index), 'clOrdID': 'ref-key-{}'.format(index), 'symbol': 'XBTUSD',
+             'side': 'Buy', 'orderQty': 100, 'price': 10000.0 + index, 'ordType': 'Limit', 'ordStatus': 'New',
+             'timestamp': datetime(2020, 1, 1, tzinfo=timezone.utc), 'text': 'Submitted via API.'}
+            for index in range(NUM_ORDERS)]
+
+
+# Example usage: python -m template_method.benchmark_response_serialization
+orders_response = create_orders_response()
+log_service = LastEntryLogService()
+bitmex_api = BitmexAPI(api_stage=list(ApiStage)[0],
+                       caller='benchmark',
+                       log_sink=SynchronousLogSink(log_service),
+                       rate_limiter=TokenBucket(rate=1e6, capacity=1e6),
+                       bitmex_client=FakeBitmexClient(
+                           handlers={'Order.Order_getOrders': lambda **params: orders_response}))
+
+
+def call_bitmex_api():
+    return bitmex_api.get_orders_of_given_status_in_last_n_minutes(n=60)
+
+
+call_bitmex_api()
+assert ITER_TO_JSON is not None, 'to_json cannot be encoded row by row, BitmexAPI serializes full responses'
+assert log_service.last_log_entry['response_body'] == to_json(orders_response)[:LOG_MESSAGE_LENGTH]
+
+# What every *_api_call closure did before the bodies became lazy
+full_serialization = timeit.timeit(lambda: to_json(orders_response), number=NUM_REPETITIONS) / NUM_REPETITIONS
+bitmex_api_call = timeit.timeit(call_bitmex_api, number=NUM_REPETITIONS) / NUM_REPETITIONS
+
+print('{:<42} = {:8.1f} us'.format('to_json of the {}-order response'.format(NUM_ORDERS), 1e6 * full_serialization))
+print('{:<42} = {:8.1f} us per call'.format('BitmexAPI call, lazily logged prefix', 1e6 * bitmex_api_call))
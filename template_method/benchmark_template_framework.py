@@ -0,0 +1,69 @@
+import time
+
+from template_method.template_framework import Template, SetupScope, PhaseTimings
+
+NUM_ACTIONS = 200
+SETUP_SECONDS = 0.02
+ACTION_SECONDS = 0.001
+
+
+def set_up_model():
+    # Stands in for pulling data from DB and preparing model features
+    time.sleep(SETUP_SECONDS)
+    return {'features': list(range(1000))}
+
+
+def tear_down_model(model):
+    model.clear()
+
+
+def score(model, item):
+    time.sleep(ACTION_SECONDS)
+    return item + len(model['features'])
+
+
+def measure(name, run):
+    profiler = PhaseTimings()
+    start = time.perf_counter()
+    results = run(profiler)
+    elapsed = time.perf_counter() - start
+    assert results == [item + 1000 for item in range(NUM_ACTIONS)]
+
+    phases = ', '.join('{} {} x {:.1f} ms'.format(phase, timing['count'], 1e3 * timing['total'])
+                       for phase, timing in profiler.summary().items())
+    print('{:<28} = {:7.1f} ms ({})'.format(name, 1e3 * elapsed, phases))
+
+
+def run_per_call(profiler):
+    template = Template(set_up_model, tear_down_model, scope=SetupScope.PER_CALL, profiler=profiler)
+    return [template.run(score, item) for item in range(NUM_ACTIONS)]
+
+
+def run_pooled(profiler):
+    with Template(set_up_model, tear_down_model, scope=SetupScope.POOLED, profiler=profiler) as template:
+        return [template.run(score, item) for item in range(NUM_ACTIONS)]
+
+
+def run_pooled_in_threads(profiler):
+    with Template(set_up_model, tear_down_model, scope=SetupScope.POOLED, pool_size=4,
+                  profiler=profiler) as template:
+        return template.run_batch(score, range(NUM_ACTIONS), max_workers=4)
+
+
+def run_per_batch_in_threads(profiler):
+    template = Template(set_up_model, tear_down_model, scope=SetupScope.PER_BATCH, profiler=profiler)
+    return template.run_batch(score, range(NUM_ACTIONS), max_workers=4)
+
+
+def run_per_batch_in_processes(profiler):
+    template = Template(set_up_model, tear_down_model, scope=SetupScope.PER_BATCH, profiler=profiler)
+    return template.run_batch_in_processes(score, range(NUM_ACTIONS), max_workers=2, chunk_size=10)
+
+
+# Example usage: python -m template_method.benchmark_template_framework
+if __name__ == '__main__':
+    measure('per-call setup', run_per_call)
+    measure('pooled setup', run_pooled)
+    measure('pooled setup, 4 threads', run_pooled_in_threads)
+    measure('per-batch setup, 4 threads', run_per_batch_in_threads)
+    measure('per-batch setup, 2 processes', run_per_batch_in_processes)
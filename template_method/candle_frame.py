@@ -0,0 +1,123 @@
+import os
+from datetime import datetime, timezone, timedelta
+
+import numpy as np
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+PRICE_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+COLUMNS = ['timestamp'] + PRICE_COLUMNS
+MIN_CAPACITY = 1024
+
+
+def to_epoch_millis(timestamp):
+    if isinstance(timestamp, datetime):
+        if timestamp.tzinfo is None:
+            timestamp = timestamp.replace(tzinfo=timezone.utc)
+        return (timestamp - EPOCH) // timedelta(milliseconds=1)
+
+    return int(timestamp)
+
+
+def from_epoch_millis(epoch_millis):
+    return EPOCH + timedelta(milliseconds=int(epoch_millis))
+
+
+class CandleFrame:
+    """
+    Columnar candle history: timestamps as int64 epoch milliseconds and OHLCV as float64, each in its own
+    contiguous array. Columns are exposed as read-only views, slicing by time never copies, and a saved
+    frame is reopened by memory-mapping the column files instead of parsing them.
+    """
+
+    def __init__(self, columns, length=None):
+        self.__columns = columns
+        self.__length = len(columns['timestamp']) if length is None else length
+
+    @classmethod
+    def empty(cls, capacity=MIN_CAPACITY):
+        columns = {'timestamp': np.empty(capacity, dtype=np.int64)}
+        columns.update({column: np.empty(capacity, dtype=np.float64) for column in PRICE_COLUMNS})
+        return cls(columns, length=0)
+
+    @classmethod
+    def from_buckets(cls, buckets):
+        """Ingests `get_bucketed_trades*` output, in either order."""
+        timestamps = np.fromiter((to_epoch_millis(bucket['timestamp']) for bucket in buckets), dtype=np.int64,
+                                 count=len(buckets))
+        columns = {'timestamp': timestamps}
+        for column in PRICE_COLUMNS:
+            values = (np.nan if bucket[column] is None else bucket[column] for bucket in buckets)
+            columns[column] = np.fromiter(values, dtype=np.float64, count=len(buckets))
+
+        if len(timestamps) > 1 and np.any(np.diff(timestamps) < 0):
+            order = np.argsort(timestamps, kind='stable')
+            columns = {column: values[order] for column, values in columns.items()}
+
+        return cls(columns)
+
+    def __len__(self):
+        return self.__length
+
+    def __getattr__(self, column):
+        if column.startswith('_') or column not in COLUMNS:
+            raise AttributeError(column)
+        view = self.__columns[column][:self.__length]
+        view.flags.writeable = False
+        return view
+
+    def slice_time(self, start_time=None, end_time=None):
+        """Candles with start_time <= timestamp <= end_time, as views into this frame."""
+        timestamps = self.timestamp
+        start = 0 if start_time is None else np.searchsorted(timestamps, to_epoch_millis(start_time), side='left')
+        end = len(timestamps) if end_time is None else np.searchsorted(timestamps, to_epoch_millis(end_time),
+                                                                       side='right')
+        return CandleFrame({column: values[start:end] for column, values in self.__columns.items()},
+                           length=max(0, end - start))
+
+    def append(self, other):
+        """Appends a later page of candles (a CandleFrame or raw buckets) in place, growing geometrically."""
+        if not isinstance(other, CandleFrame):
+            other = CandleFrame.from_buckets(other)
+        if len(other) == 0:
+            return self
+        if self.__length and other.timestamp[0] <= self.timestamp[-1]:
+            raise ValueError('Appended candles must start after {}'.format(from_epoch_millis(self.timestamp[-1])))
+
+        new_length = self.__length + len(other)
+        self.__ensure_owned_capacity(new_length)
+        for column in COLUMNS:
+            self.__columns[column][self.__length:new_length] = getattr(other, column)
+        self.__length = new_length
+
+        return self
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        for column in COLUMNS:
+            np.save(os.path.join(directory, column + '.npy'), getattr(self, column))
+
+    @classmethod
+    def load(cls, directory, memory_map=True):
+        mmap_mode = 'r' if memory_map else None
+        return cls({column: np.load(os.path.join(directory, column + '.npy'), mmap_mode=mmap_mode)
+                    for column in COLUMNS})
+
+    def to_buckets(self):
+        return [{'timestamp': from_epoch_millis(timestamp), 'open': open_price, 'high': high, 'low': low,
+                 'close': close, 'volume': volume}
+                for timestamp, open_price, high, low, close, volume
+                in zip(*(getattr(self, column).tolist() for column in COLUMNS))]
+
+    def __ensure_owned_capacity(self, required_length):
+        capacity = len(self.__columns['timestamp'])
+        is_owned = all(isinstance(values, np.ndarray) and values.base is None and values.flags.writeable
+                       and not isinstance(values, np.memmap) for values in self.__columns.values())
+        if is_owned and capacity >= required_length:
+            return
+
+        new_capacity = max(MIN_CAPACITY, required_length, 2 * capacity)
+        resized = {}
+        for column, values in self.__columns.items():
+            resized[column] = np.empty(new_capacity, dtype=values.dtype)
+            resized[column][:self.__length] = values[:self.__length]
+        self.__columns = resized
@@ -0,0 +1,121 @@
+import json
+import os
+import threading
+
+from bravado.client import SwaggerClient
+from bravado.requests_client import RequestsClient
+from requests.adapters import HTTPAdapter
+
+from enums.ApiStage import ApiStage
+from market_apis.BitmexClientFactory import get_bitmex_api_client
+
+POOL_CONNECTIONS_DEFAULT = 4
+POOL_MAXSIZE_DEFAULT = 16
+
+# Same options the bitmex package uses, `result()` has to return (body, response) for BitmexAPI
+SWAGGER_CONFIG_DEFAULT = {
+    'use_models': False,
+    'validate_requests': True,
+    'validate_responses': False,
+    'also_return_response': True,
+}
+
+
+class BitmexClientRegistry:
+    """
+    Process-wide cache of bravado Bitmex clients keyed by ApiStage. The first caller for a stage builds the client
+    (spec download/parse, HTTP session), every later BitmexAPI instance reuses it together with its open connections.
+    """
+
+    def __init__(self, client_factory=get_bitmex_api_client):
+        self.__client_factory = client_factory
+        self.__clients = {}
+        self.__lock = threading.Lock()
+        self.__stage_locks = {}
+
+    def get_client(self, api_stage: ApiStage):
+        client = self.__clients.get(api_stage)
+        if client is not None:
+            return client
+
+        with self.__lock:
+            stage_lock = self.__stage_locks.setdefault(api_stage, threading.Lock())
+
+        # Only callers of the same stage wait for each other while the client is being built
+        with stage_lock:
+            client = self.__clients.get(api_stage)
+            if client is None:
+                client = self.__client_factory(api_stage)
+                self.__clients[api_stage] = client
+
+        return client
+
+    def evict(self, api_stage: ApiStage):
+        with self.__lock:
+            self.__clients.pop(api_stage, None)
+
+    def clear(self):
+        with self.__lock:
+            self.__clients.clear()
+
+
+class CachedSpecClientFactory:
+    """
+    Builds bravado clients from a swagger spec kept as `<spec_cache_dir>/<api_stage>.json`, downloading it only when
+    the file is missing, on top of a requests session with a keep-alive connection pool.
+
+    `spec_urls` maps ApiStage to the swagger.json URL, `authenticate(http_client, api_stage)` installs credentials.
+    """
+
+    def __init__(self, spec_urls, spec_cache_dir, authenticate=None, pool_connections=POOL_CONNECTIONS_DEFAULT,
+                 pool_maxsize=POOL_MAXSIZE_DEFAULT, swagger_config=None):
+        self.__spec_urls = spec_urls
+        self.__spec_cache_dir = spec_cache_dir
+        self.__authenticate = authenticate
+        self.__pool_connections = pool_connections
+        self.__pool_maxsize = pool_maxsize
+        self.__swagger_config = swagger_config if swagger_config is not None else SWAGGER_CONFIG_DEFAULT
+
+    def __call__(self, api_stage: ApiStage):
+        spec_url = self.__spec_urls[api_stage]
+        http_client = self.create_http_client()
+        if self.__authenticate is not None:
+            self.__authenticate(http_client, api_stage)
+
+        spec_dict = self.load_spec(api_stage, http_client)
+
+        return SwaggerClient.from_spec(spec_dict, origin_url=spec_url, http_client=http_client,
+                                       config=self.__swagger_config)
+
+    def create_http_client(self):
+        http_client = RequestsClient()
+        adapter = HTTPAdapter(pool_connections=self.__pool_connections, pool_maxsize=self.__pool_maxsize)
+        http_client.session.mount('https://', adapter)
+        http_client.session.mount('http://', adapter)
+
+        return http_client
+
+    def load_spec(self, api_stage: ApiStage, http_client):
+        spec_file_path = self.get_spec_file_path(api_stage)
+        if os.path.exists(spec_file_path):
+            with open(spec_file_path) as spec_file:
+                return json.load(spec_file)
+
+        response = http_client.session.get(self.__spec_urls[api_stage])
+        response.raise_for_status()
+        spec_dict = response.json()
+
+        os.makedirs(self.__spec_cache_dir, exist_ok=True)
+        temporary_file_path = '{}.{}.tmp'.format(spec_file_path, os.getpid())
+        with open(temporary_file_path, 'w') as spec_file:
+            json.dump(spec_dict, spec_file)
+        os.replace(temporary_file_path, spec_file_path)
+
+        return spec_dict
+
+    def get_spec_file_path(self, api_stage: ApiStage):
+        return os.path.join(self.__spec_cache_dir, '{}.json'.format(api_stage.value))
+
+
+# Shared by every BitmexAPI in the process, so short-lived instances do not rebuild the swagger client
+SHARED_CLIENT_REGISTRY = BitmexClientRegistry()
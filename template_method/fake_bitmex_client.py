@@ -0,0 +1,269 @@
+import json
+import threading
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from bravado.exception import make_http_exception
+
+STATUS_REASONS = {
+    200: 'OK',
+    400: 'Bad Request',
+    404: 'Not Found',
+    429: 'Too Many Requests',
+    503: 'Service Unavailable',
+}
+
+
+class FakeClock:
+    """Clock for tests, sleeping only moves time forward."""
+
+    def __init__(self, start=0.0):
+        self.current_time = start
+        self.sleeps = []
+
+    def now(self):
+        return self.current_time
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.current_time += seconds
+
+
+class FakeResponse:
+
+    def __init__(self, status_code, headers=None, text=''):
+        self.status_code = status_code
+        self.reason = STATUS_REASONS.get(status_code, '')
+        self.headers = headers or {}
+        self.text = text
+
+    def __str__(self):
+        return '{} {}'.format(self.status_code, self.reason)
+
+
+class FakeHttpFuture:
+
+    def __init__(self, respond):
+        self.__respond = respond
+
+    def result(self, timeout=None):
+        return self.__respond()
+
+
+class FakeResource:
+
+    def __init__(self, client, resource_name):
+        self.__client = client
+        self.__resource_name = resource_name
+
+    def __getattr__(self, operation_name):
+        def operation(**params):
+            return FakeHttpFuture(lambda: self.__client.respond(self.__resource_name, operation_name, params))
+
+        return operation
+
+
+class FakeBitmexClient:
+    """
+    Stands in for the bravado Bitmex client, i.e. `client.<Resource>.<Operation>(**params).result()`
+    returning `(body, response)`.
+
+    `handlers` maps 'Resource.Operation' to a function of the request params returning the body.
+    `scripted_statuses` maps 'Resource.Operation' to a list of statuses (or `(status, headers)` tuples)
+    that are served, in order, before the handler is used. Every call is recorded in `calls`.
+    """
+
+    def __init__(self, handlers=None, scripted_statuses=None, latency=0.0):
+        self.handlers = handlers or {}
+        self.latency = latency
+        self.calls = []
+        self.__scripted_statuses = defaultdict(list, {key: list(value)
+                                                      for key, value in (scripted_statuses or {}).items()})
+        self.__lock = threading.Lock()
+
+    def __getattr__(self, resource_name):
+        if resource_name.startswith('_'):
+            raise AttributeError(resource_name)
+        return FakeResource(self, resource_name)
+
+    def respond(self, resource_name, operation_name, params):
+        key = '{}.{}'.format(resource_name, operation_name)
+
+        with self.__lock:
+            self.calls.append((key, params))
+            scripted = self.__scripted_statuses[key]
+            scripted_status = scripted.pop(0) if scripted else None
+
+        if self.latency:
+            time.sleep(self.latency)
+
+        if scripted_status is not None:
+            status_code, headers = scripted_status if isinstance(scripted_status, tuple) else (scripted_status, {})
+            if status_code >= 400:
+                raise make_http_exception(FakeResponse(status_code, headers))
+
+        if key not in self.handlers:
+            raise make_http_exception(FakeResponse(404, text='No fake handler for {}'.format(key)))
+
+        return self.handlers[key](**params), FakeResponse(200)
+
+    def count_calls(self, key):
+        return len([call for call in self.calls if call[0] == key])
+
+
+def get_default_handlers(btc_price=10000.0):
+    """Plausible canned responses for every endpoint BitmexAPI uses."""
+
+    def get_position(**params):
+        return [{'symbol': 'XBTUSD', 'currentQty': 100, 'avgEntryPrice': btc_price}]
+
+    def get_margin(**params):
+        return {'currency': 'XBt', 'walletBalance': 100000000}
+
+    def get_trades(symbol='XBTUSD', count=1, **params):
+        return [{'symbol': symbol, 'side': 'Buy', 'size': 1, 'price': btc_price} for _ in range(count)]
+
+    def get_bucketed_trades(symbol='XBTUSD', count=1, **params):
+        return [{'symbol': symbol, 'open': btc_price, 'high': btc_price, 'low': btc_price, 'close': btc_price,
+                 'volume': 1} for _ in range(count)]
+
+    def new_order(clOrdID=None, orderQty=None, price=None, ordType=None, **params):
+        return {'clOrdID': clOrdID, 'orderQty': orderQty, 'price': price, 'ordType': ordType, 'ordStatus': 'New'}
+
+    def new_orders(orders='[]', **params):
+        return [new_order(**order) for order in json.loads(orders)]
+
+    def cancel_order(clOrdID=None, **params):
+        ref_keys = json.loads(clOrdID) if clOrdID.startswith('[') else [clOrdID]
+        return [{'clOrdID': ref_key, 'ordStatus': 'Canceled'} for ref_key in ref_keys]
+
+    def get_orders(**params):
+        return []
+
+    def get_executions(**params):
+        return []
+
+    return {
+        'Position.Position_get': get_position,
+        'User.User_getMargin': get_margin,
+        'Trade.Trade_get': get_trades,
+        'Trade.Trade_getBucketed': get_bucketed_trades,
+        'Order.Order_new': new_order,
+        'Order.Order_newBulk': new_orders,
+        'Order.Order_cancel': cancel_order,
+        'Order.Order_getOrders': get_orders,
+        'Execution.Execution_get': get_executions,
+    }
+
+
+def get_synthetic_bucketed_trades_handler(first_timestamp, num_buckets, bin_duration=timedelta(minutes=1),
+                                          start_price=10000.0):
+    """Serves a deterministic candle history of `num_buckets` buckets honouring startTime, endTime and count."""
+
+    def get_bucketed_trades(symbol='XBTUSD', startTime=None, endTime=None, count=1000, reverse=False, **params):
+        first_index = 0
+        if startTime is not None:
+            first_index = max(0, -((first_timestamp - startTime) // bin_duration))
+        last_index = num_buckets - 1
+        if endTime is not None:
+            last_index = min(last_index, (endTime - first_timestamp) // bin_duration)
+
+        indices = range(first_index, last_index + 1)
+        indices = list(reversed(indices))[:count] if reverse else list(indices)[:count]
+
+        return [get_synthetic_bucket(symbol, first_timestamp + index * bin_duration, start_price + index)
+                for index in indices]
+
+    return get_bucketed_trades
+
+
+def get_synthetic_bucket(symbol, timestamp, price):
+    return {'timestamp': timestamp, 'symbol': symbol, 'open': price, 'high': price + 0.5, 'low': price - 0.5,
+            'close': price + 0.25, 'trades': 10, 'volume': 1000, 'vwap': price, 'lastSize': 1,
+            'turnover': 1000 * price, 'homeNotional': 0.1, 'foreignNotional': 1000}
+
+
+class FakeOrderStream:
+    """
+    Evolving account history: orders are placed, filled and canceled over time, each change stamped with `now()`.
+    `handlers()` serves Order_getOrders and Execution_get the way Bitmex does (startTime, start, count, reverse,
+    filter) and counts every row it returns in `served_row_count`.
+    """
+
+    def __init__(self, now):
+        self.__now = now
+        self.__orders = {}
+        self.__executions = []
+        self.__sequence = 0
+        self.__lock = threading.Lock()
+        self.served_row_count = 0
+
+    def place(self, ref_key, order_qty=100, price=10000.0):
+        with self.__lock:
+            order_id = 'order-{}'.format(len(self.__orders))
+            self.__orders[ref_key] = {'orderID': order_id, 'clOrdID': ref_key, 'symbol': 'XBTUSD',
+                                      'orderQty': order_qty, 'price': price, 'ordType': 'Limit', 'ordStatus': 'New'}
+            self.__touch(self.__orders[ref_key])
+
+    def fill(self, ref_key):
+        with self.__lock:
+            order = self.__orders[ref_key]
+            order['ordStatus'] = 'Filled'
+            self.__touch(order)
+            self.__executions.append({'execID': 'exec-{}'.format(len(self.__executions)), 'orderID': order['orderID'],
+                                      'clOrdID': ref_key, 'lastQty': order['orderQty'], 'lastPx': order['price'],
+                                      'ordStatus': 'Filled', 'timestamp': order['timestamp'],
+                                      'sequence': order['sequence']})
+
+    def cancel(self, ref_key):
+        with self.__lock:
+            order = self.__orders[ref_key]
+            order['ordStatus'] = 'Canceled'
+            self.__touch(order)
+
+    def get_open_ref_keys(self):
+        with self.__lock:
+            return [ref_key for ref_key, order in self.__orders.items() if order['ordStatus'] == 'New']
+
+    def get_orders(self):
+        with self.__lock:
+            return [dict(order) for order in self.__orders.values()]
+
+    def handlers(self):
+        def get_orders(startTime=None, start=0, count=100, reverse=False, filter=None, **params):
+            with self.__lock:
+                rows = [dict(order) for order in self.__orders.values() if matches_filter(order, filter)]
+            return self.__serve(rows, startTime, start, count, reverse)
+
+        def get_executions(startTime=None, start=0, count=100, reverse=False, **params):
+            with self.__lock:
+                rows = [dict(execution) for execution in self.__executions]
+            return self.__serve(rows, startTime, start, count, reverse)
+
+        return {
+            'Order.Order_getOrders': get_orders,
+            'Execution.Execution_get': get_executions,
+        }
+
+    def __serve(self, rows, start_time, start, count, reverse):
+        rows = sorted((row for row in rows if start_time is None or row['timestamp'] >= start_time),
+                      key=lambda row: row['sequence'], reverse=reverse)[start:start + count]
+        self.served_row_count += len(rows)
+
+        return rows
+
+    def __touch(self, order):
+        self.__sequence += 1
+        order['timestamp'] = self.__now()
+        order['sequence'] = self.__sequence
+
+
+def matches_filter(order, filter_object):
+    if filter_object is None:
+        return True
+
+    conditions = json.loads(filter_object)
+    if conditions.get('open'):
+        return order['ordStatus'] in ('New', 'PartiallyFilled')
+    return all(order.get(key) == value for key, value in conditions.items())
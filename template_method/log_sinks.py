@@ -0,0 +1,169 @@
+import atexit
+import json
+import threading
+import time
+from collections import deque
+from enum import Enum
+
+from template_method.api_call_logging import LOGGER
+
+BATCH_SIZE_DEFAULT = 100
+FLUSH_INTERVAL_DEFAULT = 1.0
+MAX_QUEUE_SIZE_DEFAULT = 10000
+
+
+class BackpressurePolicy(Enum):
+    BLOCK = 'BLOCK'
+    DROP_OLDEST = 'DROP_OLDEST'
+    SPILL_TO_FILE = 'SPILL_TO_FILE'
+
+
+class SynchronousLogSink:
+    """
+    Writes every API call log straight through to the LogService on the calling thread. A LogService wraps one DB
+    session, so this sink is only thread-safe when the caller says the service is (`is_thread_safe=True`).
+    """
+
+    def __init__(self, log_service, is_thread_safe=False):
+        self.__log_service = log_service
+        self.is_thread_safe = is_thread_safe
+
+    def log_api_call(self, **log_entry):
+        self.__log_service.log_api_call(**log_entry)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class BatchedLogSink:
+    """
+    Write-behind sink. Callers only append to a bounded in-memory queue, a background thread
+    drains it in batches of `batch_size` (or whatever has accumulated after `flush_interval` seconds).
+    When the queue is full the `backpressure_policy` decides what happens to the new entry.
+    Entries logged after `close` are written through on the calling thread.
+
+    Thread-safe: any number of threads may log, the flusher thread alone talks to the LogService.
+
+    Batches are written with one bulk insert only if the service has `log_api_calls(log_entries)`. The LogService in
+    database/ only has `log_api_call`, so there every batch is still inserted one row at a time: the sink takes the
+    writes off the calling thread but does not save round trips until LogService gets a bulk insert.
+    """
+    is_thread_safe = True
+
+    def __init__(self, log_service, batch_size=BATCH_SIZE_DEFAULT, flush_interval=FLUSH_INTERVAL_DEFAULT,
+                 max_queue_size=MAX_QUEUE_SIZE_DEFAULT, backpressure_policy=BackpressurePolicy.BLOCK,
+                 spill_file_path=None):
+        if backpressure_policy == BackpressurePolicy.SPILL_TO_FILE and spill_file_path is None:
+            raise ValueError('spill_file_path is required for backpressure_policy = {}'.format(backpressure_policy))
+
+        self.__log_service = log_service
+        self.__batch_size = batch_size
+        self.__flush_interval = flush_interval
+        self.__max_queue_size = max_queue_size
+        self.__backpressure_policy = backpressure_policy
+        self.__spill_file_path = spill_file_path
+
+        self.__queue = deque()
+        self.__condition = threading.Condition()
+        self.__batches_in_flight = 0
+        self.__is_flush_requested = False
+        self.__is_closed = False
+        self.dropped_count = 0
+        self.spilled_count = 0
+        self.written_after_close_count = 0
+
+        self.__flusher = threading.Thread(target=self.__run_flusher, name='BatchedLogSinkFlusher', daemon=True)
+        self.__flusher.start()
+        atexit.register(self.close)
+
+    def log_api_call(self, **log_entry):
+        with self.__condition:
+            if len(self.__queue) >= self.__max_queue_size and not self.__is_closed:
+                if self.__backpressure_policy == BackpressurePolicy.BLOCK:
+                    while len(self.__queue) >= self.__max_queue_size and not self.__is_closed:
+                        self.__condition.wait()
+                elif self.__backpressure_policy == BackpressurePolicy.DROP_OLDEST:
+                    self.__queue.popleft()
+                    self.dropped_count += 1
+                else:
+                    self.__spill(log_entry)
+                    return
+
+            if not self.__is_closed:
+                self.__queue.append(log_entry)
+                if len(self.__queue) >= self.__batch_size:
+                    self.__condition.notify_all()
+                return
+
+            self.written_after_close_count += 1
+
+        # The flusher is gone (e.g. closed at exit while a call was finishing). Raising here would replace the result
+        # of the API call being logged, so write through on this thread instead, spilling if that fails.
+        self.__write_batch([log_entry])
+
+    def flush(self):
+        with self.__condition:
+            self.__is_flush_requested = True
+            self.__condition.notify_all()
+            while self.__queue or self.__batches_in_flight:
+                self.__condition.wait()
+            self.__is_flush_requested = False
+
+    def close(self):
+        with self.__condition:
+            if self.__is_closed:
+                return
+            self.__is_closed = True
+            self.__condition.notify_all()
+
+        self.__flusher.join()
+        atexit.unregister(self.close)
+
+    def __run_flusher(self):
+        while True:
+            with self.__condition:
+                deadline = time.monotonic() + self.__flush_interval
+                while len(self.__queue) < self.__batch_size and not self.__is_closed \
+                        and not (self.__is_flush_requested and self.__queue):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.__condition.wait(remaining)
+
+                if not self.__queue:
+                    if self.__is_closed:
+                        return
+                    continue
+
+                batch = [self.__queue.popleft() for _ in range(min(self.__batch_size, len(self.__queue)))]
+                self.__batches_in_flight += 1
+                self.__condition.notify_all()
+
+            try:
+                self.__write_batch(batch)
+            finally:
+                with self.__condition:
+                    self.__batches_in_flight -= 1
+                    self.__condition.notify_all()
+
+    def __write_batch(self, batch):
+        try:
+            if hasattr(self.__log_service, 'log_api_calls'):
+                self.__log_service.log_api_calls(batch)
+            else:
+                # Per-row fallback, what database.LogService gets today
+                for log_entry in batch:
+                    self.__log_service.log_api_call(**log_entry)
+        except Exception as e:
+            LOGGER.error('Failed to write a batch of %d API call logs: %s', len(batch), e)
+            if self.__spill_file_path is not None:
+                for log_entry in batch:
+                    self.__spill(log_entry)
+
+    def __spill(self, log_entry):
+        with open(self.__spill_file_path, 'a') as spill_file:
+            spill_file.write(json.dumps(log_entry, default=str) + '\n')
+        self.spilled_count += 1
@@ -0,0 +1,161 @@
+import threading
+from collections import defaultdict
+
+from enums.OrderStatus import OrderStatus
+from exceptions import IllegalActionException
+from template_method.real_world_example import BitmexAPI, GET_ORDERS_COUNT
+from utils.TimeUtils import get_past_utc_date
+
+# Bitmex ordStatus values matching each OrderStatus, see real_world_example.get_orders_filter_object
+ORD_STATUSES = {
+    OrderStatus.EXECUTED: ['Filled'],
+    OrderStatus.CANCELED: ['Canceled'],
+    OrderStatus.PLACED: ['New', 'PartiallyFilled'],
+}
+# Orders in these states never change again, so they can be dropped once they are out of the retention window
+TERMINAL_ORD_STATUSES = ['Filled', 'Canceled', 'Rejected']
+
+
+def fetch_rows_since(fetch_page, start_time, page_size):
+    """
+    Pages forward by timestamp rather than by offset, so rows that get updated (and move to the end) while
+    we page cannot shift an unseen row past us. Rows at the boundary timestamp come back twice, callers dedupe.
+    """
+    rows = []
+    start = 0
+    while True:
+        page = fetch_page(start_time, start, page_size)
+        rows.extend(page)
+        if len(page) < page_size:
+            return rows
+
+        last_timestamp = page[-1]['timestamp']
+        # A full page sharing one timestamp cannot move the start time forward, so skip over it by offset
+        start = start + len(page) if last_timestamp == start_time else 0
+        start_time = last_timestamp
+
+
+class OrderExecutionBook:
+    """
+    Local copy of the account's orders and executions, kept up to date by fetching only what changed since the
+    latest timestamp seen. Orders are indexed by orderID, clOrdID and ordStatus, executions are deduplicated by execID.
+
+    `get_orders_of_given_status_in_last_n_minutes` and `get_order_executions_in_last_n_minutes` answer the same
+    queries as BitmexAPI, syncing first, and like it return at most the GET_ORDERS_COUNT newest orders.
+    The other lookups read the book as of the last sync.
+
+    Every sync drops executions and Filled/Canceled/Rejected orders older than `retention_minutes` (by default
+    `initial_lookback_minutes`, None keeps everything), so the book stays bounded. Open orders are kept however old
+    they are. Queries reaching further back than the retention window only see the open orders there.
+    """
+
+    def __init__(self, bitmex_api: BitmexAPI, initial_lookback_minutes=None, page_size=GET_ORDERS_COUNT,
+                 get_past_date=get_past_utc_date, retention_minutes=None):
+        self.__bitmex_api = bitmex_api
+        self.__page_size = page_size
+        self.__get_past_date = get_past_date
+        self.__retention_minutes = retention_minutes if retention_minutes is not None else initial_lookback_minutes
+        initial_start_time = get_past_date(60 * initial_lookback_minutes) if initial_lookback_minutes is not None \
+            else None
+        self.__orders_watermark = initial_start_time
+        self.__executions_watermark = initial_start_time
+
+        self.__orders = {}
+        self.__orders_by_ref_key = {}
+        self.__orders_by_status = defaultdict(dict)
+        self.__executions = {}
+        self.__lock = threading.Lock()
+        self.fetched_row_count = 0
+
+    def sync(self):
+        with self.__lock:
+            orders = fetch_rows_since(self.__bitmex_api.get_orders_since, self.__orders_watermark, self.__page_size)
+            for order in orders:
+                self.__upsert_order(order)
+                self.__orders_watermark = max_timestamp(self.__orders_watermark, order['timestamp'])
+
+            executions = fetch_rows_since(self.__bitmex_api.get_order_executions_since, self.__executions_watermark,
+                                          self.__page_size)
+            for execution in executions:
+                self.__executions.setdefault(execution['execID'], execution)
+                self.__executions_watermark = max_timestamp(self.__executions_watermark, execution['timestamp'])
+
+            self.fetched_row_count += len(orders) + len(executions)
+            if self.__retention_minutes is not None:
+                self.__prune(self.__get_past_date(60 * self.__retention_minutes))
+
+    def get_orders_of_given_status_in_last_n_minutes(self, order_status: OrderStatus = None, n=None):
+        self.sync()
+        start_time = self.__get_past_date(60 * n) if n is not None else None
+
+        with self.__lock:
+            orders = [order for order in self.__iter_orders_of_status(order_status)
+                      if start_time is None or order['timestamp'] >= start_time]
+
+        # Newest first and capped, like the count=GET_ORDERS_COUNT, reverse=True query it replaces
+        return sorted(orders, key=lambda order: order['timestamp'], reverse=True)[:GET_ORDERS_COUNT]
+
+    def get_order_executions_in_last_n_minutes(self, n=None):
+        self.sync()
+        start_time = self.__get_past_date(60 * n) if n is not None else None
+
+        with self.__lock:
+            executions = [execution for execution in self.__executions.values()
+                          if start_time is None or execution['timestamp'] >= start_time]
+
+        return sorted(executions, key=lambda execution: execution['timestamp'])
+
+    def get_order_by_ref_key(self, ref_key):
+        with self.__lock:
+            return self.__orders_by_ref_key.get(ref_key)
+
+    def get_orders_of_status(self, order_status: OrderStatus = None):
+        with self.__lock:
+            return list(self.__iter_orders_of_status(order_status))
+
+    def get_execution(self, exec_id):
+        with self.__lock:
+            return self.__executions.get(exec_id)
+
+    def __len__(self):
+        with self.__lock:
+            return len(self.__orders) + len(self.__executions)
+
+    def __iter_orders_of_status(self, order_status):
+        if order_status is None:
+            return iter(self.__orders.values())
+        if order_status not in ORD_STATUSES:
+            raise IllegalActionException('Order status {} is unknown to OrderExecutionBook'.format(order_status))
+
+        return (order for ord_status in ORD_STATUSES[order_status]
+                for order in self.__orders_by_status[ord_status].values())
+
+    def __upsert_order(self, order):
+        order_id = order['orderID']
+        existing_order = self.__orders.get(order_id)
+        if existing_order is not None:
+            if existing_order['timestamp'] > order['timestamp']:
+                return
+            del self.__orders_by_status[existing_order['ordStatus']][order_id]
+
+        self.__orders[order_id] = order
+        self.__orders_by_status[order['ordStatus']][order_id] = order
+        if order.get('clOrdID'):
+            self.__orders_by_ref_key[order['clOrdID']] = order
+
+    def __prune(self, cutoff):
+        for ord_status in TERMINAL_ORD_STATUSES:
+            orders_of_status = self.__orders_by_status[ord_status]
+            for order_id in [order_id for order_id, order in orders_of_status.items() if order['timestamp'] < cutoff]:
+                order = orders_of_status.pop(order_id)
+                del self.__orders[order_id]
+                if self.__orders_by_ref_key.get(order.get('clOrdID')) is order:
+                    del self.__orders_by_ref_key[order['clOrdID']]
+
+        for exec_id in [exec_id for exec_id, execution in self.__executions.items()
+                        if execution['timestamp'] < cutoff]:
+            del self.__executions[exec_id]
+
+
+def max_timestamp(watermark, timestamp):
+    return timestamp if watermark is None or timestamp > watermark else watermark
@@ -0,0 +1,121 @@
+import random
+import threading
+import time
+
+MAX_RETRY_COUNT_DEFAULT = 10
+BASE_DELAY_DEFAULT = 0.5
+MAX_DELAY_DEFAULT = 60.0
+
+# Bitmex allows 60 authenticated requests per minute per API key
+REQUESTS_PER_SECOND_DEFAULT = 1.0
+BURST_SIZE_DEFAULT = 60
+
+RETRY_AFTER_HEADER = 'Retry-After'
+RATE_LIMIT_REMAINING_HEADER = 'X-RateLimit-Remaining'
+RATE_LIMIT_RESET_HEADER = 'X-RateLimit-Reset'
+
+
+class SystemClock:
+
+    def now(self):
+        return time.time()
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. `acquire` blocks until a token is available, so callers are paced
+    before they ever get a 429. `pause_until` stops handing out tokens to every caller, e.g. when the
+    exchange tells us to back off.
+    """
+
+    def __init__(self, rate=REQUESTS_PER_SECOND_DEFAULT, capacity=BURST_SIZE_DEFAULT, clock=None):
+        self.__rate = rate
+        self.__capacity = capacity
+        self.__clock = clock if clock is not None else SystemClock()
+        self.__tokens = capacity
+        self.__last_refill = self.__clock.now()
+        self.__paused_until = 0.0
+        self.__lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        while True:
+            with self.__lock:
+                now = self.__clock.now()
+                self.__refill(now)
+
+                if now < self.__paused_until:
+                    wait_time = self.__paused_until - now
+                elif self.__tokens >= tokens:
+                    self.__tokens -= tokens
+                    return
+                else:
+                    wait_time = (tokens - self.__tokens) / self.__rate
+
+            self.__clock.sleep(wait_time)
+
+    def pause_until(self, timestamp):
+        with self.__lock:
+            self.__paused_until = max(self.__paused_until, timestamp)
+            # One request may go as soon as the pause ends (it is what the exchange asked for), the rest are paced
+            self.__tokens = min(self.__capacity, 1)
+            self.__last_refill = max(self.__last_refill, self.__paused_until)
+
+    def pause_for(self, seconds):
+        self.pause_until(self.__clock.now() + seconds)
+
+    def __refill(self, now):
+        if now > self.__last_refill:
+            self.__tokens = min(self.__capacity, self.__tokens + (now - self.__last_refill) * self.__rate)
+            self.__last_refill = now
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter, never waiting less than the exchange asked us to."""
+
+    def __init__(self, max_retry_count=MAX_RETRY_COUNT_DEFAULT, base_delay=BASE_DELAY_DEFAULT,
+                 max_delay=MAX_DELAY_DEFAULT, clock=None, random_generator=None):
+        self.max_retry_count = max_retry_count
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.clock = clock if clock is not None else SystemClock()
+        self.__random = random_generator if random_generator is not None else random.Random()
+
+    def should_retry(self, retry_count):
+        return retry_count < self.max_retry_count
+
+    def get_delay(self, retry_count, retry_after=None):
+        backoff = min(self.max_delay, self.base_delay * 2 ** retry_count)
+        delay = self.__random.uniform(0, backoff)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+
+        return delay
+
+
+def get_retry_after_seconds(response, clock):
+    headers = getattr(response, 'headers', None) or {}
+
+    retry_after = headers.get(RETRY_AFTER_HEADER)
+    if retry_after is not None:
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            pass
+
+    remaining = headers.get(RATE_LIMIT_REMAINING_HEADER)
+    reset = headers.get(RATE_LIMIT_RESET_HEADER)
+    if remaining is not None and reset is not None:
+        try:
+            if int(remaining) <= 0:
+                return max(0.0, float(reset) - clock.now())
+        except ValueError:
+            pass
+
+    return None
+
+
+# Shared by every BitmexAPI in the process, so several bots on one key are paced together
+SHARED_RATE_LIMITER = TokenBucket()
@@ -1,6 +1,8 @@
 import json
 import time
+from collections import namedtuple
 from datetime import datetime
+from typing import List
 from bravado.exception import HTTPError, HTTPTooManyRequests, HTTPServiceUnavailable
 
 from database.LogService import LogService
@@ -9,7 +11,6 @@ from enums.OrderStatus import OrderStatus
 from enums.OrderSide import OrderSide
 from enums.PositionType import PositionType
 from exceptions import IllegalActionException
-from market_apis.BitmexClientFactory import get_bitmex_api_client
 from models.ApiCallLog import LOG_MESSAGE_LENGTH
 from models.Order import Order
 from models.Position import Position
@@ -17,6 +18,13 @@ from utils.json_utils import to_json
 from utils.TimeUtils import get_past_utc_date
 from models.AlgorithmStepSnapshot import AlgorithmStepSnapshot
 from models.AlgorithmRun import AlgorithmRun
+from template_method.api_call_logging import ApiCallRecord, LOGGER, log_api_call_record
+from template_method.api_metrics import ApiMetrics
+from template_method.client_registry import BitmexClientRegistry, SHARED_CLIENT_REGISTRY
+from template_method.log_sinks import SynchronousLogSink
+from template_method.rate_limiting import RetryPolicy, SHARED_RATE_LIMITER, get_retry_after_seconds
+from template_method.response_cache import TtlCache
+from template_method.response_serialization import LazyResponseBody, get_element_wise_serializer
 
 GET_ORDERS_COUNT = 500
 COUNT_DEFAULT = 1000
@@ -25,36 +33,174 @@ BITCOIN_SYMBOL = 'XBTUSD'
 
 MAX_RETRY_COUNT = 100
 DURATION_BETWEEN_RETRIES = 2
+MAX_DURATION_BETWEEN_RETRIES = 60
+
+SATOSHIS_TO_BTC = 0.00000001
+
+# Encodes list responses one row at a time with to_json, so a log prefix never serializes the whole response
+ITER_TO_JSON = get_element_wise_serializer(to_json)
+
+# Read-only endpoints, the only ones that may be served from a TtlCache
+GET_BUCKETED_TRADES = 'GET_BUCKETED_TRADES'
+GET_BUCKETED_TRADES_SINCE_TIMESTAMP = 'GET_BUCKETED_TRADES_SINCE_TIMESTAMP'
+GET_POSITION = 'GET_POSITION'
+GET_LAST_TRADES = 'GET_LAST_TRADES'
+GET_BTC_BALANCE = 'GET_BTC_BALANCE'
+GET_ORDER_EXECUTIONS = 'GET_ORDER_EXECUTIONS'
+GET_ORDERS = 'GET_ORDERS'
+
+CACHE_TTLS_DEFAULT = {
+    GET_POSITION: 1.0,
+    GET_LAST_TRADES: 1.0,
+    GET_BTC_BALANCE: 1.0,
+    GET_ORDER_EXECUTIONS: 1.0,
+    GET_ORDERS: 1.0,
+}
+ENDPOINTS_AFFECTED_BY_ORDERS = [GET_POSITION, GET_BTC_BALANCE, GET_ORDER_EXECUTIONS, GET_ORDERS]
+
+PLACE_ORDER = 'PLACE_ORDER'
+ADD_STOP_LOSS = 'ADD_STOP_LOSS'
+CANCEL_ORDER = 'CANCEL_ORDER'
+EXECUTE_ORDER = 'EXECUTE_ORDER'
+PLACE_ORDERS = 'PLACE_ORDERS'
+CANCEL_ORDERS = 'CANCEL_ORDERS'
+
+# Max orders sent in one bulk request
+BULK_ORDERS_CHUNK_SIZE = 10
+
+BulkOrderResult = namedtuple('BulkOrderResult', ['reference_key', 'response', 'error'])
+
+
+def extract_position_from_response(response):
+    qty = response['currentQty']
+    size = abs(qty)
+    price = response['avgEntryPrice']
+    position_type = PositionType.LONG if qty >= 0 else PositionType.SHORT
+
+    return Position(size=size, price=price, position_type=position_type)
+
+
+def get_orders_filter_object(order_status: OrderStatus):
+    if order_status is None:
+        return None
+    elif order_status == OrderStatus.EXECUTED:
+        return json.dumps({
+            'ordStatus': 'Filled'
+        })
+    elif order_status == OrderStatus.CANCELED:
+        return json.dumps({
+            'ordStatus': 'Canceled'
+        })
+    elif order_status == OrderStatus.PLACED:
+        return json.dumps({
+            'open': True
+        })
+    else:
+        error_message = '''
+Trying to perform an API call to Bitmex API with order_status = {}. This order status is unknown
+        '''.format(order_status)
+        raise IllegalActionException(error_message)
+
+
+def get_limit_order_params(order: Order):
+    size_sign = 1 if order.order_side == OrderSide.BUY else -1
+
+    return {
+        'symbol': 'XBTUSD',
+        'orderQty': size_sign * order.size,
+        'price': order.price,
+        'clOrdID': order.reference_key,
+        'ordType': 'Limit'
+    }
+
+
+def get_chunks(items, chunk_size):
+    return [items[index:index + chunk_size] for index in range(0, len(items), chunk_size)]
+
+
+def map_bulk_response(reference_keys, response):
+    orders_by_reference_key = {order['clOrdID']: order for order in response}
+    results = []
+    for reference_key in reference_keys:
+        order = orders_by_reference_key.get(reference_key)
+        if order is None:
+            error = 'Bitmex did not return order {}'.format(reference_key)
+        elif order.get('error'):
+            error = order['error']
+        elif order.get('ordStatus') == 'Rejected':
+            error = order.get('ordRejReason') or order.get('text') or 'Rejected'
+        else:
+            error = None
+        results.append(BulkOrderResult(reference_key=reference_key, response=order, error=error))
+
+    return results
+
+
+def identity(value):
+    return value
+
+
+# extract_body picks the part of the raw response that is logged, extract_result turns it into the returned object
+Endpoint = namedtuple('Endpoint', ['name', 'resource', 'operation', 'is_read_only', 'extract_body', 'extract_result'],
+                      defaults=[identity, identity])
+
+ENDPOINTS = {endpoint.name: endpoint for endpoint in [
+    Endpoint(GET_BUCKETED_TRADES, 'Trade', 'Trade_getBucketed', is_read_only=True),
+    Endpoint(GET_BUCKETED_TRADES_SINCE_TIMESTAMP, 'Trade', 'Trade_getBucketed', is_read_only=True),
+    Endpoint(GET_POSITION, 'Position', 'Position_get', is_read_only=True,
+             extract_result=lambda response: extract_position_from_response(response[0])),
+    Endpoint(GET_LAST_TRADES, 'Trade', 'Trade_get', is_read_only=True),
+    Endpoint(GET_BTC_BALANCE, 'User', 'User_getMargin', is_read_only=True,
+             extract_result=lambda response: response['walletBalance'] * SATOSHIS_TO_BTC),
+    Endpoint(GET_ORDER_EXECUTIONS, 'Execution', 'Execution_get', is_read_only=True),
+    Endpoint(GET_ORDERS, 'Order', 'Order_getOrders', is_read_only=True),
+    Endpoint(PLACE_ORDER, 'Order', 'Order_new', is_read_only=False),
+    Endpoint(ADD_STOP_LOSS, 'Order', 'Order_new', is_read_only=False),
+    Endpoint(CANCEL_ORDER, 'Order', 'Order_cancel', is_read_only=False, extract_body=lambda response: response[0]),
+    Endpoint(EXECUTE_ORDER, 'Order', 'Order_new', is_read_only=False),
+    Endpoint(PLACE_ORDERS, 'Order', 'Order_newBulk', is_read_only=False),
+    Endpoint(CANCEL_ORDERS, 'Order', 'Order_cancel', is_read_only=False),
+]}
 
 
 class BitmexAPI:
 
-    def __init__(self, api_stage: ApiStage, caller, session=None, with_verbose_logging=False):
-        self.__bitmex_client = self.init_bitmex_client(api_stage)
-        self.__log_service = LogService(session)
+    def __init__(self, api_stage: ApiStage, caller, session=None, with_verbose_logging=False, log_sink=None,
+                 retry_policy=None, rate_limiter=None, bitmex_client=None, response_cache: TtlCache = None,
+                 metrics: ApiMetrics = None, client_registry: BitmexClientRegistry = None):
+        self.__log_sink = log_sink if log_sink is not None else SynchronousLogSink(LogService(session))
         self.__api_vendor_name = 'Bitmex' + api_stage.value
         self.__caller = caller
         self.__with_verbose_logging = with_verbose_logging
+        self.__retry_policy = retry_policy if retry_policy is not None else RetryPolicy(
+            max_retry_count=MAX_RETRY_COUNT, base_delay=DURATION_BETWEEN_RETRIES, max_delay=MAX_DURATION_BETWEEN_RETRIES)
+        self.__rate_limiter = rate_limiter if rate_limiter is not None else SHARED_RATE_LIMITER
+        self.__response_cache = response_cache
+        self.__metrics = metrics
+        self.__client_registry = client_registry if client_registry is not None else SHARED_CLIENT_REGISTRY
+        self.__bitmex_client = bitmex_client if bitmex_client is not None else self.init_bitmex_client(api_stage)
+
+    @property
+    def log_sink(self):
+        return self.__log_sink
 
     def init_bitmex_client(self, api_stage):
         time_of_call = datetime.now()
 
         try:
-            return get_bitmex_api_client(api_stage)
+            return self.__client_registry.get_client(api_stage)
         except HTTPError as e:
-            status_code = ''
-            error_message = ''
-            print('Response Code = ', status_code)
-            print()
-            print('Error Message = ', error_message)
-
-            self.__log_service.log_api_call(vendor=self.__api_vendor_name,
-                                            api_name='INITIALISATION_OF_BITMEX_CLIENT',
-                                            status_code=status_code,
-                                            error_message=error_message,
-                                            response_body='',
-                                            time_of_call=time_of_call,
-                                            caller=self.__caller)
+            status_code = str(e.response)
+            error_message = str(e)[:LOG_MESSAGE_LENGTH]
+            LOGGER.error('Failed to initialise the Bitmex client: status=%s error=%s', status_code, error_message)
+
+            self.__log_sink.log_api_call(vendor=self.__api_vendor_name,
+                                         api_name='INITIALISATION_OF_BITMEX_CLIENT',
+                                         status_code=status_code,
+                                         error_message=error_message,
+                                         response_body='',
+                                         time_of_call=time_of_call,
+                                         caller=self.__caller)
             raise e
 
     def get_current_btc_price(self):
@@ -62,256 +208,234 @@ class BitmexAPI:
         return last_trade['price']
 
     def get_bucketed_trades(self, symbol=BITCOIN_SYMBOL, bin_size=BIN_SIZE_DEFAULT, n=COUNT_DEFAULT, reverse=True):
-        def get_last_bucketed_trades_api_call():
-            result = self.__bitmex_client.Trade.Trade_getBucketed(symbol=symbol, binSize=bin_size, count=n,
-                                                                  reverse=reverse).result()
-
-            status_code = str(result[1])
-            response_body = to_json(result[0])
-            result_object = result[0]
-
-            return status_code, response_body, result_object
-
-        return self.__run_with_log(api_name='GET_LAST_{}_{}_BUCKETED_TRADES_FOR_{}'.format(n, bin_size, symbol),
-                                   api_call=get_last_bucketed_trades_api_call)
+        return self.__call_endpoint(endpoint_name=GET_BUCKETED_TRADES,
+                                    api_name='GET_LAST_{}_{}_BUCKETED_TRADES_FOR_{}'.format(n, bin_size, symbol),
+                                    cache_args=(symbol, bin_size, n, reverse),
+                                    symbol=symbol, binSize=bin_size, count=n, reverse=reverse)
 
     def get_bucketed_trades_since_timestamp(self, timestamp, symbol=BITCOIN_SYMBOL, bin_size=BIN_SIZE_DEFAULT,
-                                            max_result_count=COUNT_DEFAULT):
-        def get_bucketed_trades_since_timestamp_api_call():
-            result = self.__bitmex_client.Trade.Trade_getBucketed(symbol=symbol, startTime=timestamp, binSize=bin_size,
-                                                                  count=max_result_count).result()
-
-            status_code = str(result[1])
-            response_body = to_json(result[0])
-            result_object = result[0]
-
-            return status_code, response_body, result_object
-
-        return self.__run_with_log(
+                                            max_result_count=COUNT_DEFAULT, end_time=None):
+        return self.__call_endpoint(
+            endpoint_name=GET_BUCKETED_TRADES_SINCE_TIMESTAMP,
             api_name='GET_{}_BUCKETED_TRADES_SINCE_{}_FOR_{}_MAX_{}'.format(bin_size, timestamp, symbol,
                                                                             max_result_count),
-            api_call=get_bucketed_trades_since_timestamp_api_call)
+            cache_args=(timestamp, symbol, bin_size, max_result_count, end_time),
+            symbol=symbol, startTime=timestamp, endTime=end_time, binSize=bin_size, count=max_result_count)
 
     def place_order(self, order: Order):
-        def place_order_api_call():
-            size_sign = 1 if order.order_side == OrderSide.BUY else -1
-
-            result = self.__bitmex_client.Order.Order_new(symbol='XBTUSD',
-                                                          orderQty=size_sign * order.size,
-                                                          price=order.price,
-                                                          clOrdID=order.reference_key,
-                                                          ordType='Limit').result()
-
-            status_code = str(result[1])
-            response_body = to_json(result[0])
-            result_object = result[0]
-
-            return status_code, response_body, result_object
-
-        return self.__run_with_log(api_name='PLACE_ORDER_{}'.format(order.reference_key), api_call=place_order_api_call)
+        return self.__call_endpoint(endpoint_name=PLACE_ORDER,
+                                    api_name='PLACE_ORDER_{}'.format(order.reference_key),
+                                    **get_limit_order_params(order))
+
+    def place_orders(self, orders: List[Order]) -> List[BulkOrderResult]:
+        """
+        Places limit orders through the bulk endpoint, BULK_ORDERS_CHUNK_SIZE orders (one request and one log
+        entry) at a time. A failed chunk does not stop the rest, its orders are returned with the error instead.
+        """
+        results = []
+        for chunk in get_chunks(orders, BULK_ORDERS_CHUNK_SIZE):
+            reference_keys = [order.reference_key for order in chunk]
+            try:
+                response = self.__call_endpoint(
+                    endpoint_name=PLACE_ORDERS,
+                    api_name='PLACE_{}_ORDERS_FROM_{}'.format(len(chunk), chunk[0].reference_key),
+                    orders=json.dumps([get_limit_order_params(order) for order in chunk]))
+                results.extend(map_bulk_response(reference_keys, response))
+            except HTTPError as e:
+                results.extend(BulkOrderResult(reference_key=reference_key, response=None, error=str(e))
+                               for reference_key in reference_keys)
+
+        return results
 
     def add_stop_loss(self, order: Order):
-        def add_stop_loss_api_call():
-            result = self.__bitmex_client.Order.Order_new(symbol='XBTUSD',
-                                                          side=order.order_side.value,
-                                                          clOrdID=order.reference_key,
-                                                          ordType='Stop',
-                                                          stopPx=order.price,
-                                                          execInst='LastPrice,Close').result()
-
-            status_code = str(result[1])
-            response_body = to_json(result[0])
-            result_object = result[0]
-
-            return status_code, response_body, result_object
-
-        return self.__run_with_log(api_name='ADD_STOP_LOSS_{}'.format(order.reference_key),
-                                   api_call=add_stop_loss_api_call)
+        return self.__call_endpoint(endpoint_name=ADD_STOP_LOSS,
+                                    api_name='ADD_STOP_LOSS_{}'.format(order.reference_key),
+                                    symbol='XBTUSD',
+                                    side=order.order_side.value,
+                                    clOrdID=order.reference_key,
+                                    ordType='Stop',
+                                    stopPx=order.price,
+                                    execInst='LastPrice,Close')
 
     def cancel_order_by_ref_key(self, ref_key: str):
-        def cancel_order_api_call():
-            result = self.__bitmex_client.Order.Order_cancel(clOrdID=ref_key).result()
-
-            status_code = str(result[1])
-            response_body = to_json(result[0][0])
-            result_object = result[0][0]
-
-            return status_code, response_body, result_object
-
-        return self.__run_with_log(api_name='CANCEL_ORDER_{}'.format(ref_key), api_call=cancel_order_api_call)
+        return self.__call_endpoint(endpoint_name=CANCEL_ORDER,
+                                    api_name='CANCEL_ORDER_{}'.format(ref_key),
+                                    clOrdID=ref_key)
+
+    def cancel_orders_by_ref_keys(self, ref_keys: List[str]) -> List[BulkOrderResult]:
+        results = []
+        for chunk in get_chunks(list(ref_keys), BULK_ORDERS_CHUNK_SIZE):
+            try:
+                response = self.__call_endpoint(endpoint_name=CANCEL_ORDERS,
+                                                api_name='CANCEL_{}_ORDERS_FROM_{}'.format(len(chunk), chunk[0]),
+                                                clOrdID=json.dumps(chunk))
+                results.extend(map_bulk_response(chunk, response))
+            except HTTPError as e:
+                results.extend(BulkOrderResult(reference_key=ref_key, response=None, error=str(e)) for ref_key in chunk)
+
+        return results
 
     def execute_order_on_market(self, order):
-        def execute_order_api_call():
-            size_sign = 1 if order.order_side == OrderSide.BUY else -1
+        size_sign = 1 if order.order_side == OrderSide.BUY else -1
 
-            result = self.__bitmex_client.Order.Order_new(symbol='XBTUSD',
-                                                          orderQty=size_sign * order.size,
-                                                          clOrdID=order.reference_key,
-                                                          ordType='Market').result()
-
-            status_code = str(result[1])
-            response_body = to_json(result[0])
-            result_object = result[0]
-
-            return status_code, response_body, result_object
-
-        return self.__run_with_log(api_name='EXECUTE_ORDER_{}'.format(order.reference_key),
-                                   api_call=execute_order_api_call)
+        return self.__call_endpoint(endpoint_name=EXECUTE_ORDER,
+                                    api_name='EXECUTE_ORDER_{}'.format(order.reference_key),
+                                    symbol='XBTUSD',
+                                    orderQty=size_sign * order.size,
+                                    clOrdID=order.reference_key,
+                                    ordType='Market')
 
     def get_position(self) -> Position:
-        def extract_position_from_response(response):
-            qty = response['currentQty']
-            size = abs(qty)
-            price = response['avgEntryPrice']
-            position_type = PositionType.LONG if qty >= 0 else PositionType.SHORT
-
-            return Position(size=size, price=price, position_type=position_type)
-
-        def get_position_api_call():
-            result = self.__bitmex_client.Position.Position_get().result()
-
-            status_code = str(result[1])
-            response_body = to_json(result[0])
-            result_object = extract_position_from_response(result[0][0])
-
-            return status_code, response_body, result_object
-
-        return self.__run_with_log(api_name='GET_POSITION', api_call=get_position_api_call)
+        return self.__call_endpoint(endpoint_name=GET_POSITION, api_name='GET_POSITION')
 
     def get_last_n_trades(self, symbol, n):
-        def get_trades_api_call():
-            result = self.__bitmex_client.Trade.Trade_get(symbol=symbol, count=n, reverse=True).result()
-
-            status_code = str(result[1])
-            response_body = to_json(result[0])
-            result_object = result[0]
-
-            return status_code, response_body, result_object
-
-        return self.__run_with_log(api_name='GET_LAST_{}_TRADES_FOR_{}'.format(n, symbol), api_call=get_trades_api_call)
+        return self.__call_endpoint(endpoint_name=GET_LAST_TRADES,
+                                    api_name='GET_LAST_{}_TRADES_FOR_{}'.format(n, symbol),
+                                    cache_args=(symbol, n),
+                                    symbol=symbol, count=n, reverse=True)
 
     def get_btc_balance(self):
-        def get_btc_balance_api_call():
-            result = self.__bitmex_client.User.User_getMargin(currency='XBt').result()
-
-            status_code = str(result[1])
-            response_body = to_json(result[0])
-            result_object = result[0]['walletBalance'] * 0.00000001
-
-            return status_code, response_body, result_object
-
-        return self.__run_with_log(api_name='GET_BTC_BALANCE', api_call=get_btc_balance_api_call)
+        return self.__call_endpoint(endpoint_name=GET_BTC_BALANCE, api_name='GET_BTC_BALANCE', currency='XBt')
 
     def get_order_executions_in_last_n_minutes(self, n=None):
         start_time = get_past_utc_date(seconds=60 * n) if n is not None else None
 
-        def get_order_executions_api_call():
-            result = self.__bitmex_client.Execution.Execution_get(startTime=start_time).result()
-            status_code = str(result[1])
-            response_body = to_json(result[0])
-            result_object = result[0]
+        return self.__call_endpoint(endpoint_name=GET_ORDER_EXECUTIONS,
+                                    api_name='GET_ORDER_EXECUTIONS_IN_LAST_{}_MINUTES'.format(n),
+                                    cache_args=(n,),
+                                    startTime=start_time)
 
-            return status_code, response_body, result_object
+    def get_order_executions_since(self, start_time, start=0, count=GET_ORDERS_COUNT):
+        return self.__call_endpoint(endpoint_name=GET_ORDER_EXECUTIONS,
+                                    api_name='GET_ORDER_EXECUTIONS_SINCE_{}_FROM_{}'.format(start_time, start),
+                                    cache_args=('SINCE', start_time, start, count),
+                                    count=count, start=start, reverse=False, startTime=start_time)
 
-        return self.__run_with_log(api_name='GET_ORDER_EXECUTIONS_IN_LAST_{}_MINUTES'.format(n),
-                                   api_call=get_order_executions_api_call)
+    def get_orders_since(self, start_time, start=0, count=GET_ORDERS_COUNT):
+        return self.__call_endpoint(endpoint_name=GET_ORDERS,
+                                    api_name='GET_ORDERS_SINCE_{}_FROM_{}'.format(start_time, start),
+                                    cache_args=('SINCE', start_time, start, count),
+                                    count=count, start=start, reverse=False, startTime=start_time)
 
     def get_orders_of_given_status_in_last_n_minutes(self, order_status: OrderStatus = None, n=None):
+        filter_object = get_orders_filter_object(order_status)
+        start_time = get_past_utc_date(seconds=60 * n) if n is not None else None
+        LOGGER.debug('Getting Orders of status %s since %s', order_status, start_time)
 
-        def get_orders_api_call():
-            def get_filter_object():
-                if order_status is None:
-                    return None
-                elif order_status == OrderStatus.EXECUTED:
-                    return json.dumps({
-                        'ordStatus': 'Filled'
-                    })
-                elif order_status == OrderStatus.CANCELED:
-                    return json.dumps({
-                        'ordStatus': 'Canceled'
-                    })
-                elif order_status == OrderStatus.PLACED:
-                    return json.dumps({
-                        'open': True
-                    })
-                else:
-                    error_message = '''
-Trying to perform an API call to Bitmex API with order_status = {}. This order status is unknown
-                    '''.format(order_status)
-                    raise IllegalActionException(error_message)
+        return self.__call_endpoint(endpoint_name=GET_ORDERS,
+                                    api_name='GET_{}_ORDERS_IN_LAST_{}_MINUTES'.format(str(order_status), n),
+                                    cache_args=(order_status, n),
+                                    count=GET_ORDERS_COUNT, reverse=True, filter=filter_object, startTime=start_time)
+
+    def __call_endpoint(self, endpoint_name, api_name, cache_args=(), **params):
+        endpoint = ENDPOINTS[endpoint_name]
 
-            filter_object = get_filter_object()
-            start_time = get_past_utc_date(seconds=60 * n) if n is not None else None
-            print('Getting Orders of status {} between {} and {}'.format(str(order_status), start_time, get_past_utc_date(0)))
-            result = self.__bitmex_client.Order.Order_getOrders(count=GET_ORDERS_COUNT, reverse=True,
-                                                                filter=filter_object, startTime=start_time).result()
+        def api_call():
+            operation = getattr(getattr(self.__bitmex_client, endpoint.resource), endpoint.operation)
+            result = operation(**params).result()
 
             status_code = str(result[1])
-            response_body = to_json(result[0])
-            result_object = result[0]
+            response_body = endpoint.extract_body(result[0])
+            result_object = endpoint.extract_result(response_body)
+
+            # The logged prefix is encoded with to_json itself, so the DB row and the verbose log always agree
+            return status_code, LazyResponseBody(response_body, serialize=to_json, iter_serialize=ITER_TO_JSON), \
+                result_object
+
+        if not endpoint.is_read_only:
+            return self.__run_with_invalidation(endpoint_name=endpoint.name, api_name=api_name, api_call=api_call)
 
-            return status_code, response_body, result_object
+        return self.__run_with_cache(endpoint_name=endpoint.name, args=cache_args, api_name=api_name,
+                                     api_call=api_call)
 
-        return self.__run_with_log(api_name='GET_{}_ORDERS_IN_LAST_{}_MINUTES'.format(str(order_status), n),
-                                   api_call=get_orders_api_call)
+    def __run_with_cache(self, endpoint_name, args, api_name, api_call):
+        if self.__response_cache is None:
+            return self.__run_with_log(endpoint_name=endpoint_name, api_name=api_name, api_call=api_call)
 
-    def __run_with_log(self, api_name, api_call, retry_count=0):
+        return self.__response_cache.get_or_load(
+            endpoint_name, args,
+            lambda: self.__run_with_log(endpoint_name=endpoint_name, api_name=api_name, api_call=api_call))
+
+    def __run_with_invalidation(self, endpoint_name, api_name, api_call):
+        try:
+            return self.__run_with_log(endpoint_name=endpoint_name, api_name=api_name, api_call=api_call)
+        finally:
+            # Even a failed write may have reached the exchange, so never trust the cached state afterwards
+            if self.__response_cache is not None:
+                self.__response_cache.invalidate(ENDPOINTS_AFFECTED_BY_ORDERS)
+
+    def __run_with_log(self, endpoint_name, api_name, api_call):
+        retry_count = 0
+
+        while True:
+            self.__rate_limiter.acquire()
+
+            try:
+                return self.__run_attempt_with_log(endpoint_name=endpoint_name, api_name=api_name, api_call=api_call,
+                                                   retry_count=retry_count)
+            except (HTTPTooManyRequests, HTTPServiceUnavailable) as e:
+                if not self.__retry_policy.should_retry(retry_count):
+                    LOGGER.error('api_name=%s giving up after retry_count=%d (max_retry_count=%d)',
+                                 api_name, retry_count, self.__retry_policy.max_retry_count)
+                    raise e
+
+                retry_after = get_retry_after_seconds(e.response, self.__retry_policy.clock)
+                if retry_after is not None:
+                    self.__rate_limiter.pause_for(retry_after)
+
+                delay = self.__retry_policy.get_delay(retry_count, retry_after)
+                LOGGER.warning('api_name=%s status=%s retry_count=%d, retrying in %.2f seconds',
+                               api_name, e.response, retry_count, delay)
+                self.__retry_policy.clock.sleep(delay)
+                retry_count += 1
+                if self.__metrics is not None:
+                    self.__metrics.record_retry(endpoint_name)
+
+    def __run_attempt_with_log(self, endpoint_name, api_name, api_call, retry_count=0):
         time_of_call = datetime.now()
+        start = time.perf_counter()
         status_code = ''
         error_message = ''
-        concatenated_response_body = ''
-        full_response_body = ''
+        response_body = None
+        exception = None
 
         try:
-            (status_code, response_message, result_object) = api_call()
-
-            status_code = status_code
-            full_response_body = response_message
-            concatenated_response_body = response_message[:LOG_MESSAGE_LENGTH]
+            (status_code, response_body, result_object) = api_call()
 
             return result_object
 
-        except (HTTPTooManyRequests, HTTPServiceUnavailable) as e:
-            status_code = str(e.response)
-            error_message = str(e)[:LOG_MESSAGE_LENGTH]
-            print('STATUS CODE: ', status_code)
-            print('ERROR: ', error_message)
-            if retry_count <= MAX_RETRY_COUNT:
-                print('retry_count ({}) <= max_retry_count({})'.format(retry_count, MAX_RETRY_COUNT))
-                print('-> Sleeping for {} seconds and retrying'.format(DURATION_BETWEEN_RETRIES))
-                time.sleep(DURATION_BETWEEN_RETRIES)
-                return self.__run_with_log(api_name=api_name, api_call=api_call, retry_count=retry_count + 1)
-            else:
-                print('retry_count ({}) > max_retry_count({})'.format(retry_count, MAX_RETRY_COUNT))
-                print('-> Throwing an error')
-                status_code = str(e.response)
-                error_message = str(e)[:LOG_MESSAGE_LENGTH]
-
-                raise e
-
-
         except HTTPError as e:
             status_code = str(e.response)
             error_message = str(e)[:LOG_MESSAGE_LENGTH]
+            exception = e
+
+            raise e
+        except Exception as e:
+            exception = e
 
             raise e
         finally:
-            print('-------------------------------------API CALL BEGINNING----------------------------')
-            print('API Name = ', api_name)
-            print('Response Code = ', status_code)
-            print('Api Executed at = ', time_of_call)
-
-            if self.__with_verbose_logging:
-                print()
-                print('Full Response Body = ', full_response_body)
-                print()
-                print('Error Message = ', error_message)
-            print('-------------------------------------API CALL END---------------------------------')
-
-            self.__log_service.log_api_call(vendor=self.__api_vendor_name,
-                                            api_name=api_name,
-                                            status_code=status_code,
-                                            error_message=error_message,
-                                            response_body=concatenated_response_body,
-                                            time_of_call=time_of_call,
-                                            caller=self.__caller)
+            duration = time.perf_counter() - start
+            if self.__metrics is not None:
+                self.__metrics.record_attempt(endpoint_name, status_code, duration, exception)
+
+            log_api_call_record(ApiCallRecord(api_name=api_name,
+                                              status_code=status_code,
+                                              duration=duration,
+                                              retry_count=retry_count,
+                                              time_of_call=time_of_call,
+                                              error_message=error_message))
+
+            if self.__with_verbose_logging and response_body is not None:
+                # The body is only serialized if a DEBUG handler actually formats the record
+                LOGGER.debug('api_name=%s full_response_body=%s', api_name, response_body)
+
+            concatenated_response_body = response_body.truncated(LOG_MESSAGE_LENGTH) if response_body is not None \
+                else ''
+            self.__log_sink.log_api_call(vendor=self.__api_vendor_name,
+                                         api_name=api_name,
+                                         status_code=status_code,
+                                         error_message=error_message,
+                                         response_body=concatenated_response_body,
+                                         time_of_call=time_of_call,
+                                         caller=self.__caller)
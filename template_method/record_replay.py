@@ -0,0 +1,221 @@
+import gzip
+import random
+import threading
+import time
+from collections import defaultdict, namedtuple
+from datetime import datetime
+
+import msgpack
+from bravado.exception import HTTPError, make_http_exception
+
+from template_method.fake_bitmex_client import FakeResource, FakeResponse
+from template_method.rate_limiting import RETRY_AFTER_HEADER
+
+# msgpack extension type carrying datetimes (startTime params, timestamp fields) as ISO 8601 strings
+DATETIME_EXT_TYPE = 1
+
+# One request/response pair, `key` is 'Resource.Operation' as in FakeBitmexClient, `body` is the error text for errors
+RecordedExchange = namedtuple('RecordedExchange', ['key', 'params', 'status_code', 'headers', 'body', 'duration'])
+
+
+def encode_value(value):
+    if isinstance(value, datetime):
+        return msgpack.ExtType(DATETIME_EXT_TYPE, value.isoformat().encode())
+    raise TypeError('Cannot record a value of type {}'.format(type(value).__name__))
+
+
+def decode_ext(code, data):
+    if code == DATETIME_EXT_TYPE:
+        return datetime.fromisoformat(data.decode())
+    return msgpack.ExtType(code, data)
+
+
+def get_params_key(params):
+    return tuple(sorted((name, str(value)) for name, value in params.items()))
+
+
+class ExchangeRecorder:
+    """Appends RecordedExchanges to a gzipped stream of msgpack arrays, see `load_recording`."""
+
+    def __init__(self, file_path):
+        self.__file = gzip.open(file_path, 'wb')
+        self.__packer = msgpack.Packer(default=encode_value)
+        self.__lock = threading.Lock()
+        self.recorded_count = 0
+
+    def record(self, exchange: RecordedExchange):
+        packed_exchange = self.__packer.pack(list(exchange))
+        with self.__lock:
+            self.__file.write(packed_exchange)
+            self.recorded_count += 1
+
+    def close(self):
+        with self.__lock:
+            self.__file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def load_recording(file_path):
+    with gzip.open(file_path, 'rb') as recording_file:
+        unpacker = msgpack.Unpacker(recording_file, ext_hook=decode_ext, raw=False, strict_map_key=False)
+        return [RecordedExchange(*exchange) for exchange in unpacker]
+
+
+class RecordingHttpFuture:
+
+    def __init__(self, http_future, key, params, recorder):
+        self.__http_future = http_future
+        self.__key = key
+        self.__params = params
+        self.__recorder = recorder
+
+    def result(self, timeout=None):
+        start = time.perf_counter()
+        try:
+            body, response = self.__http_future.result(timeout=timeout)
+        except HTTPError as e:
+            self.__recorder.record(RecordedExchange(key=self.__key, params=self.__params,
+                                                    status_code=e.response.status_code,
+                                                    headers=dict(getattr(e.response, 'headers', None) or {}),
+                                                    body=getattr(e.response, 'text', ''),
+                                                    duration=time.perf_counter() - start))
+            raise e
+
+        self.__recorder.record(RecordedExchange(key=self.__key, params=self.__params,
+                                                status_code=response.status_code,
+                                                headers=dict(getattr(response, 'headers', None) or {}),
+                                                body=body,
+                                                duration=time.perf_counter() - start))
+
+        return body, response
+
+
+class RecordingResource:
+
+    def __init__(self, resource, resource_name, recorder):
+        self.__resource = resource
+        self.__resource_name = resource_name
+        self.__recorder = recorder
+
+    def __getattr__(self, operation_name):
+        operation = getattr(self.__resource, operation_name)
+        key = '{}.{}'.format(self.__resource_name, operation_name)
+
+        def recording_operation(**params):
+            return RecordingHttpFuture(operation(**params), key, params, self.__recorder)
+
+        return recording_operation
+
+
+class RecordingBitmexClient:
+    """
+    Wraps a bravado Bitmex client (or anything shaped like one) and records every request/response pair, errors
+    included, into `recorder`. Pass it to BitmexAPI as `bitmex_client` to capture traffic for ReplayBitmexClient.
+    """
+
+    def __init__(self, bitmex_client, recorder: ExchangeRecorder):
+        self.__bitmex_client = bitmex_client
+        self.__recorder = recorder
+
+    def __getattr__(self, resource_name):
+        if resource_name.startswith('_'):
+            raise AttributeError(resource_name)
+        return RecordingResource(getattr(self.__bitmex_client, resource_name), resource_name, self.__recorder)
+
+
+class ReplayBitmexClient:
+    """
+    Serves recorded exchanges in place of the bravado Bitmex client. A request gets the recordings with the same
+    operation and params in turn, or, when nothing matches (fresh clOrdIDs, moving startTimes), the recordings of
+    its operation in turn; `miss_count` counts those. Recorded bodies are shared between replays, do not mutate them.
+
+    Every call waits `latency` seconds, or its recorded duration times `latency_scale` when `latency` is None.
+    `error_rates` maps a status (429, 503) to the probability of failing a call with it instead, the error carries
+    a Retry-After header of `retry_after` seconds if given.
+    """
+
+    def __init__(self, exchanges, latency=None, latency_scale=1.0, error_rates=None, retry_after=None, seed=None,
+                 sleep=time.sleep):
+        self.__latency = latency
+        self.__latency_scale = latency_scale
+        self.__error_rates = sorted((error_rates or {}).items())
+        self.__retry_after = retry_after
+        self.__sleep = sleep
+        self.__random = random.Random(seed)
+        self.__lock = threading.Lock()
+
+        self.__exchanges_by_params = defaultdict(list)
+        self.__exchanges_by_key = defaultdict(list)
+        for exchange in exchanges:
+            self.__exchanges_by_params[(exchange.key, get_params_key(exchange.params))].append(exchange)
+            self.__exchanges_by_key[exchange.key].append(exchange)
+        self.__positions = defaultdict(int)
+
+        self.call_count = 0
+        self.miss_count = 0
+        self.injected_error_counts = defaultdict(int)
+
+    def __getattr__(self, resource_name):
+        if resource_name.startswith('_'):
+            raise AttributeError(resource_name)
+        return FakeResource(self, resource_name)
+
+    def respond(self, resource_name, operation_name, params):
+        key = '{}.{}'.format(resource_name, operation_name)
+
+        with self.__lock:
+            self.call_count += 1
+            exchange = self.__find_exchange(key, params)
+            injected_status = self.__draw_error_status()
+            if injected_status is not None:
+                self.injected_error_counts[injected_status] += 1
+
+        delay = self.__latency
+        if delay is None:
+            delay = exchange.duration * self.__latency_scale if exchange is not None else 0.0
+        if delay:
+            self.__sleep(delay)
+
+        if injected_status is not None:
+            headers = {RETRY_AFTER_HEADER: str(self.__retry_after)} if self.__retry_after is not None else {}
+            raise make_http_exception(FakeResponse(injected_status, headers))
+
+        if exchange is None:
+            raise make_http_exception(FakeResponse(404, text='Nothing recorded for {}'.format(key)))
+
+        if exchange.status_code >= 400:
+            raise make_http_exception(FakeResponse(exchange.status_code, exchange.headers, exchange.body))
+
+        return exchange.body, FakeResponse(exchange.status_code, exchange.headers)
+
+    def __find_exchange(self, key, params):
+        position_key = (key, get_params_key(params))
+        exchanges = self.__exchanges_by_params.get(position_key)
+        if not exchanges:
+            exchanges = self.__exchanges_by_key.get(key)
+            if not exchanges:
+                return None
+            self.miss_count += 1
+            position_key = key
+
+        position = self.__positions[position_key]
+        self.__positions[position_key] = position + 1
+
+        return exchanges[position % len(exchanges)]
+
+    def __draw_error_status(self):
+        if not self.__error_rates:
+            return None
+
+        draw = self.__random.random()
+        for status_code, error_rate in self.__error_rates:
+            if draw < error_rate:
+                return status_code
+            draw -= error_rate
+
+        return None
@@ -0,0 +1,105 @@
+import threading
+from collections import Counter
+
+from template_method.rate_limiting import SystemClock
+
+MAX_ENTRIES_DEFAULT = 1000
+
+
+class InFlightCall:
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class TtlCache:
+    """
+    Per-endpoint TTL cache keyed on the call arguments. Concurrent callers of the same key share one
+    in-flight load (single-flight). Only endpoints with a TTL in `ttls` are ever cached.
+    Keys that never repeat (e.g. the moving start times of the `*_since` endpoints) cannot grow it past
+    `max_entries`: once full, expired entries are dropped first, then the oldest ones.
+    """
+
+    def __init__(self, ttls, clock=None, max_entries=MAX_ENTRIES_DEFAULT):
+        self.__ttls = dict(ttls)
+        self.__max_entries = max_entries
+        self.__clock = clock if clock is not None else SystemClock()
+        self.__entries = {}
+        self.__in_flight = {}
+        self.__generations = Counter()
+        self.__lock = threading.Lock()
+        self.hits = Counter()
+        self.misses = Counter()
+
+    def is_cached_endpoint(self, endpoint_name):
+        return endpoint_name in self.__ttls
+
+    def get_or_load(self, endpoint_name, args, loader):
+        if not self.is_cached_endpoint(endpoint_name):
+            return loader()
+
+        key = (endpoint_name, args)
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is not None and entry[0] > self.__clock.now():
+                self.hits[endpoint_name] += 1
+                return entry[1]
+
+            in_flight_call = self.__in_flight.get(key)
+            is_leader = in_flight_call is None
+            if is_leader:
+                self.misses[endpoint_name] += 1
+                in_flight_call = InFlightCall()
+                self.__in_flight[key] = in_flight_call
+                generation = self.__generations[endpoint_name]
+            else:
+                self.hits[endpoint_name] += 1
+
+        if not is_leader:
+            in_flight_call.done.wait()
+            if in_flight_call.error is not None:
+                raise in_flight_call.error
+            return in_flight_call.result
+
+        try:
+            in_flight_call.result = loader()
+            return in_flight_call.result
+        except Exception as e:
+            in_flight_call.error = e
+            raise e
+        finally:
+            with self.__lock:
+                del self.__in_flight[key]
+                # A write that invalidated this endpoint while we were loading makes our result stale
+                if in_flight_call.error is None and generation == self.__generations[endpoint_name]:
+                    now = self.__clock.now()
+                    self.__entries.pop(key, None)
+                    if len(self.__entries) >= self.__max_entries:
+                        self.__evict(now)
+                    self.__entries[key] = (now + self.__ttls[endpoint_name], in_flight_call.result)
+            in_flight_call.done.set()
+
+    def __evict(self, now):
+        self.__entries = {key: entry for key, entry in self.__entries.items() if entry[0] > now}
+        # Still full of live entries, drop the oldest ones (dicts keep insertion order)
+        for key in list(self.__entries)[:len(self.__entries) - self.__max_entries + 1]:
+            del self.__entries[key]
+
+    def invalidate(self, endpoint_names=None):
+        with self.__lock:
+            endpoint_names = list(self.__ttls) if endpoint_names is None else endpoint_names
+            for endpoint_name in endpoint_names:
+                self.__generations[endpoint_name] += 1
+
+            self.__entries = {key: entry for key, entry in self.__entries.items() if key[0] not in endpoint_names}
+
+    def __len__(self):
+        with self.__lock:
+            return len(self.__entries)
+
+    def get_stats(self):
+        with self.__lock:
+            return {endpoint_name: {'hits': self.hits[endpoint_name], 'misses': self.misses[endpoint_name]}
+                    for endpoint_name in self.__ttls}
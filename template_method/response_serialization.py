@@ -0,0 +1,80 @@
+import json
+from datetime import datetime, timezone
+
+# Shaped like Bitmex rows, used to check that an element-wise serializer reproduces the full one
+SAMPLE_BODY = [
+    {'orderID': 'order-0', 'price': 10000.5, 'orderQty': -100, 'text': 'Submitted via API.\n\u00e9', 'execInst': None,
+     'timestamp': datetime(2020, 1, 1, 12, 30, tzinfo=timezone.utc), 'working': True, 'fills': [1, 2.5]},
+    {'orderID': 'order-1', 'timestamp': datetime(2020, 1, 1)},
+]
+
+
+def iter_json(obj, default=str):
+    return json.JSONEncoder(default=default).iterencode(obj)
+
+
+def get_element_wise_serializer(serialize):
+    """
+    Incremental version of `serialize` for list bodies (the large responses), calling `serialize` on one element at a
+    time and joining them the way json.dumps does. Returns None when that does not reproduce `serialize` on
+    SAMPLE_BODY, e.g. for an indenting encoder, so callers fall back to full serialization.
+    """
+
+    def iter_serialize(obj):
+        if not isinstance(obj, list) or not obj:
+            yield serialize(obj)
+            return
+
+        yield '['
+        for index, element in enumerate(obj):
+            if index:
+                yield ', '
+            yield serialize(element)
+        yield ']'
+
+    return iter_serialize if ''.join(iter_serialize(SAMPLE_BODY)) == serialize(SAMPLE_BODY) else None
+
+
+def serialize_truncated(obj, max_length, iter_serialize=iter_json):
+    """Encodes `obj` incrementally and stops as soon as `max_length` characters have been produced."""
+    chunks = []
+    length = 0
+    for chunk in iter_serialize(obj):
+        chunks.append(chunk)
+        length += len(chunk)
+        if length >= max_length:
+            break
+
+    return ''.join(chunks)[:max_length]
+
+
+class LazyResponseBody:
+    """
+    Holds a response body and only serializes it (fully or up to a prefix) when someone asks for it.
+
+    `truncated` is always a prefix of `full`. It only stops encoding early when it has an incremental encoder for the
+    same format: `iter_serialize` alone, or passed together with a `serialize` producing the same text. With just a
+    `serialize`, e.g. utils.json_utils.to_json, the prefix is cut from the full serialization.
+    """
+
+    def __init__(self, body, serialize=None, iter_serialize=None):
+        if serialize is None and iter_serialize is None:
+            iter_serialize = iter_json
+        self.__body = body
+        self.__serialize = serialize
+        self.__iter_serialize = iter_serialize
+        self.__full = None
+
+    def full(self):
+        if self.__full is None:
+            self.__full = self.__serialize(self.__body) if self.__serialize is not None \
+                else ''.join(self.__iter_serialize(self.__body))
+        return self.__full
+
+    def truncated(self, max_length):
+        if self.__full is not None or self.__iter_serialize is None:
+            return self.full()[:max_length]
+        return serialize_truncated(self.__body, max_length, self.__iter_serialize)
+
+    def __str__(self):
+        return self.full()
@@ -0,0 +1,208 @@
+import functools
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from contextlib import contextmanager
+from enum import Enum
+from multiprocessing.util import Finalize
+
+SETUP = 'setup'
+ACTION = 'action'
+TEARDOWN = 'teardown'
+
+MAX_WORKERS_DEFAULT = 4
+
+
+class SetupScope(Enum):
+    PER_CALL = 'PER_CALL'
+    PER_BATCH = 'PER_BATCH'
+    POOLED = 'POOLED'
+
+
+class PhaseTimings:
+    """Profiling hook that adds up how long every phase took and how often it ran."""
+
+    def __init__(self):
+        self.totals = defaultdict(float)
+        self.counts = defaultdict(int)
+        self.__lock = threading.Lock()
+
+    def __call__(self, phase, duration):
+        with self.__lock:
+            self.totals[phase] += duration
+            self.counts[phase] += 1
+
+    def summary(self):
+        with self.__lock:
+            return {phase: {'count': self.counts[phase], 'total': self.totals[phase]} for phase in self.totals}
+
+
+class Template:
+    """
+    The template method from after.py as a reusable object: setup, the custom action, teardown.
+    Override `setup`/`teardown` in a subclass or pass them in. Actions are called as `action(resource, *args)`.
+
+    `scope` decides how often the expensive setup runs:
+    PER_CALL redoes it for every `run`, PER_BATCH once per `run_batch`, POOLED keeps up to `pool_size` resources
+    alive across calls until `close`. Every phase is timed and reported to `profiler(phase, duration)` if given.
+    """
+
+    def __init__(self, setup=None, teardown=None, scope=SetupScope.PER_CALL, pool_size=1, profiler=None):
+        self.__setup = setup
+        self.__teardown = teardown
+        self.__scope = scope
+        self.__profiler = profiler
+        self.__idle_resources = []
+        self.__pool_slots = threading.BoundedSemaphore(pool_size)
+        self.__pool_lock = threading.Lock()
+        self.__is_closed = False
+
+    def setup(self):
+        return self.__setup() if self.__setup is not None else None
+
+    def teardown(self, resource):
+        if self.__teardown is not None:
+            self.__teardown(resource)
+
+    def run(self, action, *args, **kwargs):
+        with self.__resource() as resource:
+            return self.__run_action(action, resource, *args, **kwargs)
+
+    def run_batch(self, action, inputs, max_workers=MAX_WORKERS_DEFAULT):
+        """
+        Runs `action(resource, item)` for every item on a thread pool, results in input order. With PER_BATCH
+        all threads share one setup, so the resource must be safe to use from several threads.
+        """
+        if self.__scope != SetupScope.PER_BATCH:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                return list(executor.map(lambda item: self.run(action, item), inputs))
+
+        self.__check_not_closed()
+        resource = self.__timed(SETUP, self.setup)
+        try:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                return list(executor.map(lambda item: self.__run_action(action, resource, item), inputs))
+        finally:
+            self.__timed(TEARDOWN, self.teardown, resource)
+
+    def run_batch_in_processes(self, action, inputs, max_workers=MAX_WORKERS_DEFAULT, chunk_size=1):
+        """
+        Runs `action(resource, item)` for every item on a process pool, results in input order. Every worker process
+        runs `setup` once and `teardown` when the pool shuts down, overrides included, so `action`, the Template
+        (subclass) and the functions passed in must be picklable, e.g. module-level. The pool and the profiler stay
+        behind: profiling only covers what happens in this process.
+        """
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=initialize_worker_resource,
+                                 initargs=(self.setup, self.teardown)) as executor:
+            return list(executor.map(functools.partial(run_with_worker_resource, action), inputs,
+                                     chunksize=chunk_size))
+
+    def close(self):
+        """
+        Tears down the idle pooled resources. Resources still in use are torn down when their action finishes,
+        and running anything on a closed Template raises.
+        """
+        with self.__pool_lock:
+            self.__is_closed = True
+            idle_resources, self.__idle_resources = self.__idle_resources, []
+
+        for resource in idle_resources:
+            self.__timed(TEARDOWN, self.teardown, resource)
+
+    def __getstate__(self):
+        # Pickled for run_batch_in_processes, the workers only need setup and teardown
+        state = self.__dict__.copy()
+        for name in ['_Template__idle_resources', '_Template__pool_slots', '_Template__pool_lock',
+                     '_Template__profiler']:
+            del state[name]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.__idle_resources = []
+        self.__pool_slots = threading.BoundedSemaphore(1)
+        self.__pool_lock = threading.Lock()
+        self.__profiler = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @contextmanager
+    def __resource(self):
+        self.__check_not_closed()
+        if self.__scope != SetupScope.POOLED:
+            resource = self.__timed(SETUP, self.setup)
+            try:
+                yield resource
+            finally:
+                self.__timed(TEARDOWN, self.teardown, resource)
+            return
+
+        # Callers beyond pool_size wait for a resource to be handed back instead of setting up another one
+        self.__pool_slots.acquire()
+        try:
+            with self.__pool_lock:
+                self.__check_not_closed()
+                has_idle_resource = bool(self.__idle_resources)
+                resource = self.__idle_resources.pop() if has_idle_resource else None
+            if not has_idle_resource:
+                resource = self.__timed(SETUP, self.setup)
+            try:
+                yield resource
+            finally:
+                with self.__pool_lock:
+                    is_closed = self.__is_closed
+                    if not is_closed:
+                        self.__idle_resources.append(resource)
+                if is_closed:
+                    self.__timed(TEARDOWN, self.teardown, resource)
+        finally:
+            self.__pool_slots.release()
+
+    def __check_not_closed(self):
+        if self.__is_closed:
+            raise RuntimeError('Cannot run an action on a closed Template')
+
+    def __run_action(self, action, resource, *args, **kwargs):
+        return self.__timed(ACTION, action, resource, *args, **kwargs)
+
+    def __timed(self, phase, function, *args, **kwargs):
+        if self.__profiler is None:
+            return function(*args, **kwargs)
+
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            self.__profiler(phase, time.perf_counter() - start)
+
+
+def templated(template: Template):
+    """Decorator, `@templated(template)` turns `action(resource, *args)` into `action(*args)` run by `template`."""
+
+    def decorator(action):
+        @functools.wraps(action)
+        def wrapper(*args, **kwargs):
+            return template.run(action, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+# Set once per worker process by initialize_worker_resource
+worker_resource = None
+
+
+def initialize_worker_resource(setup, teardown):
+    global worker_resource
+    worker_resource = setup()
+    Finalize(None, teardown, args=(worker_resource,), exitpriority=10)
+
+
+def run_with_worker_resource(action, item):
+    return action(worker_resource, item)
@@ -0,0 +1,114 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from template_method.real_world_example import BitmexAPI, BITCOIN_SYMBOL, BIN_SIZE_DEFAULT, COUNT_DEFAULT
+
+BIN_SIZE_DURATIONS = {
+    '1m': timedelta(minutes=1),
+    '5m': timedelta(minutes=5),
+    '1h': timedelta(hours=1),
+    '1d': timedelta(days=1),
+}
+
+
+def get_next_page_start_time(last_bucket_timestamp, bin_size=BIN_SIZE_DEFAULT):
+    """Where to resume after `last_bucket_timestamp`, e.g. from a checkpoint saved before a failure."""
+    return last_bucket_timestamp + BIN_SIZE_DURATIONS[bin_size]
+
+
+def iter_bucketed_trades(bitmex_api: BitmexAPI, start_time, end_time, symbol=BITCOIN_SYMBOL,
+                         bin_size=BIN_SIZE_DEFAULT, page_size=COUNT_DEFAULT, prefetch=False):
+    """
+    Lazily yields every bucket between `start_time` and `end_time` (inclusive), one page of `page_size`
+    buckets in memory at a time (two when `prefetch` fetches the next page on a background thread).
+    To resume after a failure, call again with `start_time=get_next_page_start_time(last_seen_timestamp)`.
+    """
+
+    def fetch_page(page_start_time):
+        return bitmex_api.get_bucketed_trades_since_timestamp(timestamp=page_start_time, symbol=symbol,
+                                                              bin_size=bin_size, max_result_count=page_size,
+                                                              end_time=end_time)
+
+    executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+    try:
+        page = fetch_page(start_time)
+        while page:
+            next_page_start_time = get_next_page_start_time(page[-1]['timestamp'], bin_size)
+            has_next_page = len(page) >= page_size and next_page_start_time <= end_time
+            next_page = executor.submit(fetch_page, next_page_start_time) if has_next_page and prefetch else None
+
+            for bucket in page:
+                if bucket['timestamp'] > end_time:
+                    return
+                yield bucket
+
+            if not has_next_page:
+                return
+
+            page = next_page.result() if next_page is not None else fetch_page(next_page_start_time)
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+if __name__ == '__main__':
+    # Example usage: python -m template_method.trade_history
+    from datetime import datetime, timezone
+    from itertools import islice
+
+    from enums.ApiStage import ApiStage
+    from template_method.fake_bitmex_client import FakeBitmexClient, get_synthetic_bucketed_trades_handler
+    from template_method.log_sinks import SynchronousLogSink
+    from template_method.rate_limiting import TokenBucket
+
+    class NullLogService:
+
+        def log_api_call(self, **log_entry):
+            pass
+
+    first_timestamp = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    num_buckets = 2500
+    page_size = 1000
+    bin_duration = BIN_SIZE_DURATIONS[BIN_SIZE_DEFAULT]
+
+    def create_api():
+        handler = get_synthetic_bucketed_trades_handler(first_timestamp, num_buckets, bin_duration)
+        bitmex_client = FakeBitmexClient(handlers={'Trade.Trade_getBucketed': handler})
+        return bitmex_client, BitmexAPI(api_stage=list(ApiStage)[0], caller='trade_history',
+                                        log_sink=SynchronousLogSink(NullLogService()),
+                                        rate_limiter=TokenBucket(rate=1e6, capacity=1e6), bitmex_client=bitmex_client)
+
+    def get_timestamps(buckets):
+        return [bucket['timestamp'] for bucket in buckets]
+
+    def get_expected_timestamps(first_index, last_index):
+        return [first_timestamp + index * bin_duration for index in range(first_index, last_index + 1)]
+
+    for prefetch in [False, True]:
+        # end_time inside the history: three pages, the last one cut at end_time
+        bitmex_client, bitmex_api = create_api()
+        end_time = first_timestamp + 2222 * bin_duration
+        buckets = list(iter_bucketed_trades(bitmex_api, first_timestamp, end_time, page_size=page_size,
+                                            prefetch=prefetch))
+        assert get_timestamps(buckets) == get_expected_timestamps(0, 2222)
+        assert bitmex_client.count_calls('Trade.Trade_getBucketed') == 3
+
+        # end_time past the history: stops at the first short page
+        bitmex_client, bitmex_api = create_api()
+        buckets = list(iter_bucketed_trades(bitmex_api, first_timestamp + 10 * bin_duration,
+                                            first_timestamp + 10 * num_buckets * bin_duration,
+                                            page_size=page_size, prefetch=prefetch))
+        assert get_timestamps(buckets) == get_expected_timestamps(10, num_buckets - 1)
+        assert bitmex_client.count_calls('Trade.Trade_getBucketed') == 3
+
+        # Interrupted after 1500 buckets and resumed from the last one seen
+        bitmex_client, bitmex_api = create_api()
+        end_time = first_timestamp + (num_buckets - 1) * bin_duration
+        first_part = list(islice(iter_bucketed_trades(bitmex_api, first_timestamp, end_time, page_size=page_size,
+                                                      prefetch=prefetch), 1500))
+        resume_time = get_next_page_start_time(first_part[-1]['timestamp'])
+        second_part = list(iter_bucketed_trades(bitmex_api, resume_time, end_time, page_size=page_size,
+                                                prefetch=prefetch))
+        assert get_timestamps(first_part + second_part) == get_expected_timestamps(0, num_buckets - 1)
+
+        print('prefetch = {}: paging, end_time cutoff and resume OK'.format(prefetch))